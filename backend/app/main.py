@@ -1,4 +1,5 @@
 """Main FastAPI application"""
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
@@ -6,13 +7,23 @@ import os
 
 from .routers import templates, devices, locales, generate, upload, layouts
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Shut down the preview and export worker pools when the app stops"""
+    yield
+    generate.preview_pool.close()
+    generate.generator.close()
+
+
 # Create FastAPI app
 app = FastAPI(
     title="Apple Screenshot Generator API",
     description="API for generating App Store screenshots with templates and localization",
     version="1.0.0",
     docs_url="/api/docs",
-    redoc_url="/api/redoc"
+    redoc_url="/api/redoc",
+    lifespan=lifespan
 )
 
 # CORS configuration
@@ -37,6 +48,7 @@ assets_path = os.path.join(os.path.dirname(__file__), "assets")
 if os.path.exists(assets_path):
     app.mount("/assets", StaticFiles(directory=assets_path), name="assets")
 
+
 # Health check
 @app.get("/api/health")
 async def health_check():
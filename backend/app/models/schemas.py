@@ -35,6 +35,12 @@ class ExportFormat(str, Enum):
     JPEG = "jpeg"
 
 
+class RenderQuality(str, Enum):
+    DRAFT = "draft"
+    STANDARD = "standard"
+    FINAL = "final"
+
+
 # Gradient configuration
 class GradientStop(BaseModel):
     color: str
@@ -44,9 +50,17 @@ class GradientStop(BaseModel):
 class GradientConfig(BaseModel):
     type: Literal["linear", "radial"] = "linear"
     angle: float = 180
+    panoramic_angle: float = 90
     stops: List[GradientStop]
 
 
+class NoiseConfig(BaseModel):
+    enabled: bool = False
+    intensity: float = 0.03
+    monochrome: bool = True
+    seed: int = 0
+
+
 # Background configuration
 class BackgroundConfig(BaseModel):
     type: BackgroundType = BackgroundType.SOLID
@@ -54,6 +68,8 @@ class BackgroundConfig(BaseModel):
     gradient: Optional[GradientConfig] = None
     image_url: Optional[str] = None
     pattern: Optional[str] = None
+    noise: Optional[NoiseConfig] = None
+    panoramic: bool = False
 
 
 # Text styling
@@ -96,6 +112,8 @@ class DeviceConfig(BaseModel):
     shadow: bool = True
     shadow_blur: int = 40
     shadow_opacity: float = 0.3
+    # "analytic" is faster for wide blurs but draws a softer, wider shadow
+    shadow_renderer: Literal["analytic", "raster"] = "raster"
     rotation: float = 0
 
 
@@ -157,6 +175,17 @@ class GeneratePreviewRequest(BaseModel):
     locale: str = "en"
     width: int = 1290
     height: int = 2796
+    quality: RenderQuality = RenderQuality.FINAL
+    scale: Optional[float] = Field(default=None, gt=0, le=1)  # overrides the quality profile's scale
+
+
+class GeneratePanoramicPreviewRequest(BaseModel):
+    screenshots: List[ScreenshotConfig]
+    locale: str = "en"
+    width: int = 1290
+    height: int = 2796
+    quality: RenderQuality = RenderQuality.FINAL
+    scale: Optional[float] = Field(default=None, gt=0, le=1)
 
 
 class GenerateExportRequest(BaseModel):
@@ -7,13 +7,23 @@ from typing import List, Dict, Optional
 import uuid
 
 from ..services.generator import ScreenshotGenerator
-from ..models.schemas import GeneratePreviewRequest, GenerateExportRequest
+from ..services.preview_pool import PreviewPool, PreviewQueueFull
+from ..models.schemas import (
+    GeneratePreviewRequest,
+    GeneratePanoramicPreviewRequest,
+    GenerateExportRequest
+)
 
 router = APIRouter(prefix="/generate", tags=["generate"])
 
 # Initialize generator
 generator = ScreenshotGenerator()
 
+# Previews render on their own worker processes, off the event loop
+preview_pool = PreviewPool(
+    generator.upload_dir, generator.output_dir, fonts=generator.processor.fonts
+)
+
 # In-memory job tracking (in production, use Redis or database)
 export_jobs: Dict[str, dict] = {}
 
@@ -22,11 +32,14 @@ export_jobs: Dict[str, dict] = {}
 async def generate_preview(request: GeneratePreviewRequest):
     """Generate a preview image for a screenshot configuration"""
     try:
-        image_bytes = generator.generate_preview(
+        image_bytes = await preview_pool.render(
+            "generate_preview",
             screenshot_config=request.screenshot.model_dump(),
             locale=request.locale,
             width=request.width,
-            height=request.height
+            height=request.height,
+            quality=request.quality.value,
+            scale=request.scale
         )
 
         return Response(
@@ -36,10 +49,50 @@ async def generate_preview(request: GeneratePreviewRequest):
                 "Content-Disposition": "inline; filename=preview.png"
             }
         )
+    except PreviewQueueFull as e:
+        raise _queue_full_error(e)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.post("/preview/panoramic")
+async def generate_panoramic_preview(request: GeneratePanoramicPreviewRequest):
+    """Generate one wide preview image of a whole screenshot set"""
+    if not request.screenshots:
+        raise HTTPException(status_code=400, detail="No screenshots provided")
+
+    try:
+        image_bytes = await preview_pool.render(
+            "generate_panoramic_preview",
+            screenshots=[s.model_dump() for s in request.screenshots],
+            locale=request.locale,
+            width=request.width,
+            height=request.height,
+            quality=request.quality.value,
+            scale=request.scale
+        )
+
+        return Response(
+            content=image_bytes,
+            media_type="image/png",
+            headers={
+                "Content-Disposition": "inline; filename=panoramic-preview.png"
+            }
+        )
+    except PreviewQueueFull as e:
+        raise _queue_full_error(e)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+def _queue_full_error(error: PreviewQueueFull) -> HTTPException:
+    return HTTPException(
+        status_code=503,
+        detail="Preview queue is full, retry shortly",
+        headers={"Retry-After": str(error.retry_after)}
+    )
+
+
 @router.post("/export")
 async def create_export(request: GenerateExportRequest, background_tasks: BackgroundTasks):
     """Start an export job for all screenshots"""
@@ -67,14 +120,23 @@ async def create_export(request: GenerateExportRequest, background_tasks: Backgr
     }
 
 
-async def run_export_job(job_id: str, project: dict, config: dict):
-    """Background task to run export job"""
+def run_export_job(job_id: str, project: dict, config: dict):
+    """Background task to run export job
+
+    This is a plain function so Starlette runs it in its thread pool; the
+    rendering itself happens on the generator's export process pool.
+    """
+    def update_progress(done: int, total: int):
+        export_jobs[job_id]["progress"] = 10 + int(90 * done / max(total, 1))
+
     try:
         export_jobs[job_id]["status"] = "processing"
         export_jobs[job_id]["progress"] = 10
 
         # Generate exports
-        output_path = generator.generate_exports(project, config)
+        output_path = generator.generate_exports(
+            project, config, on_progress=update_progress
+        )
 
         export_jobs[job_id]["status"] = "completed"
         export_jobs[job_id]["progress"] = 100
@@ -1,9 +1,13 @@
 """Upload router"""
+import asyncio
 import os
-from fastapi import APIRouter, UploadFile, File, HTTPException
+from fastapi import APIRouter, BackgroundTasks, HTTPException, Request
 from fastapi.responses import FileResponse
 
 from ..services.generator import ScreenshotGenerator
+from ..services.upload_store import (
+    MULTIPART_OVERHEAD, MultipartUpload, UnsupportedUploadType, UploadTooLarge
+)
 
 router = APIRouter(prefix="/upload", tags=["upload"])
 
@@ -15,46 +19,80 @@ ALLOWED_TYPES = {"image/png", "image/jpeg", "image/webp"}
 MAX_FILE_SIZE = 10 * 1024 * 1024  # 10MB
 
 
-@router.post("")
-async def upload_image(file: UploadFile = File(...)):
-    """Upload a screenshot image"""
-    # Validate file type
-    if file.content_type not in ALLOWED_TYPES:
-        raise HTTPException(
-            status_code=400,
-            detail=f"Invalid file type. Allowed: {', '.join(ALLOWED_TYPES)}"
-        )
+@router.post("", openapi_extra={
+    "requestBody": {
+        "required": True,
+        "content": {"multipart/form-data": {"schema": {
+            "type": "object",
+            "properties": {"file": {"type": "string", "format": "binary"}},
+            "required": ["file"]
+        }}}
+    }
+})
+async def upload_image(request: Request, background_tasks: BackgroundTasks):
+    """Upload a screenshot image in the "file" field of a multipart form
+
+    The body is parsed as it arrives and the file is streamed to disk,
+    hashed and size-checked chunk by chunk, so an oversized upload is
+    rejected as soon as it passes the limit, and memory use doesn't grow
+    with the file size. Resized variants for each device are built after
+    the response is sent, unless the same image was uploaded before.
+    """
+    too_large = HTTPException(
+        status_code=400,
+        detail=f"File too large. Maximum size: {MAX_FILE_SIZE // 1024 // 1024}MB"
+    )
+    invalid_type = HTTPException(
+        status_code=400,
+        detail=f"Invalid file type. Allowed: {', '.join(ALLOWED_TYPES)}"
+    )
 
-    # Read file content
-    content = await file.read()
+    # Reject bodies that announce their size up front
+    content_length = request.headers.get("content-length", "")
+    if content_length.isdigit() and int(content_length) > MAX_FILE_SIZE + MULTIPART_OVERHEAD:
+        raise too_large
 
-    # Validate file size
-    if len(content) > MAX_FILE_SIZE:
-        raise HTTPException(
-            status_code=400,
-            detail=f"File too large. Maximum size: {MAX_FILE_SIZE // 1024 // 1024}MB"
+    try:
+        upload = MultipartUpload(
+            request.headers.get("content-type", ""), "file",
+            generator.upload_dir, MAX_FILE_SIZE, ALLOWED_TYPES
         )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
-    # Save file
     try:
-        result = generator.save_uploaded_image(content, file.filename)
-        return result
+        async for chunk in request.stream():
+            await asyncio.to_thread(upload.write, chunk)
+        incoming = upload.finish()
+        result = await asyncio.to_thread(
+            generator.store_upload, incoming, upload.filename, upload.content_type
+        )
+    except UploadTooLarge:
+        raise too_large
+    except UnsupportedUploadType:
+        raise invalid_type
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        upload.discard()
+
+    if not result["deduplicated"]:
+        background_tasks.add_task(
+            generator.build_upload_variants, result["id"], result["path"]
+        )
+    return result
 
 
 @router.get("/{file_id}")
 async def get_uploaded_image(file_id: str):
     """Get an uploaded image by ID"""
-    upload_dir = generator.upload_dir
-
-    # Find file with this ID
-    for filename in os.listdir(upload_dir):
-        if filename.startswith(file_id):
-            filepath = os.path.join(upload_dir, filename)
-            return FileResponse(filepath)
+    entry = generator.get_uploaded_image(file_id)
+    if entry is None or not os.path.exists(entry["path"]):
+        raise HTTPException(status_code=404, detail="Image not found")
 
-    raise HTTPException(status_code=404, detail="Image not found")
+    return FileResponse(entry["path"], media_type=entry["content_type"])
 
 
 @router.delete("/{file_id}")
@@ -0,0 +1,166 @@
+"""Soft color blobs for the blob and glassmorphism backgrounds
+
+The blob look is hard-edged circles, later ones drawn over earlier ones,
+under a heavy Gaussian blur. Rather than blurring the whole canvas, the
+blur is evaluated directly from the circles:
+
+    - across x, each row of the drawing is a handful of flat-colored
+      segments (which circle is on top between chord endpoints), and a
+      blurred segment is a difference of two erf terms
+    - down y, the blurred rows are combined with the Gaussian's exact
+      weight over each band of rows
+
+Pillow blurs in three passes per axis, each repeating the edge pixels of
+its own input past the canvas border, so circles that run off the canvas
+stay bright there. The same passes are followed here: the closed forms
+above are the first pass, and the other two run on the output grid. The
+result is smooth at the scale of sigma, so that grid is spaced a fraction
+of sigma apart and upsampled at the end. The work grows with the number
+of circles, not with the blur radius times the canvas area. Below
+MIN_SIGMA the grid gets dense enough that drawing and blurring the
+circles is cheaper.
+
+Measured against a full-resolution GaussianBlur of the drawn circles on
+1290x2796 canvases (levels out of 255, per channel): mean < 1, max <= 18.
+"""
+import math
+from typing import List, Tuple
+
+import numpy as np
+from PIL import Image
+
+from .shadows import SAMPLES_PER_SIGMA, erf
+
+# Smallest blur for which render_blobs beats drawing plus blurring
+MIN_SIGMA = 64
+
+# Box passes per axis in Pillow's GaussianBlur
+PASSES = 3
+
+
+def _phi(x: np.ndarray) -> np.ndarray:
+    """Standard normal CDF"""
+    return 0.5 * (1.0 + erf(x * math.sqrt(0.5)))
+
+
+def _clamped_weights(
+    edges: np.ndarray, centers: np.ndarray, sigma: float
+) -> np.ndarray:
+    """Gaussian blur weights from cells between edges onto centers
+
+    The first and last cells also take the kernel's mass beyond them, as
+    if the edge cells were repeated outward.
+    """
+    cdf = _phi((edges[np.newaxis, :] - centers[:, np.newaxis]) / sigma)
+    cdf[:, 0] = 0.0
+    cdf[:, -1] = 1.0
+    return np.diff(cdf, axis=1)
+
+
+def render_blobs(
+    size: Tuple[int, int],
+    blobs: List[Tuple[Tuple[int, ...], float, float, float]],
+    sigma: float
+) -> Image.Image:
+    """Render blurred circles onto a transparent RGBA image
+
+    blobs are (rgba, center_x, center_y, radius) in pixels, in drawing
+    order. Colors are blurred unpremultiplied, as Pillow blurs RGBA
+    images, so they darken toward their transparent fringes.
+    """
+    width, height = size
+    sigma = max(sigma, 0.5)
+    if not blobs:
+        return Image.new("RGBA", size, (0, 0, 0, 0))
+
+    # Output grid, and the bands of canvas rows the drawing is sampled in
+    step = max(1, int(sigma // SAMPLES_PER_SIGMA))
+    grid_x = (np.arange(-(-width // step)) + 0.5) * step
+    grid_y = (np.arange(-(-height // step)) + 0.5) * step
+    band = step
+    band_edges = np.arange(0, height + band, band, dtype=np.float64)
+    band_edges[-1] = height
+    rows = (band_edges[:-1] + band_edges[1:]) / 2.0
+
+    # Chord of each circle on each sampled row; chords reaching the canvas
+    # edge continue past it, and rows that miss a circle get an empty chord
+    centers_x = np.array([blob[1] for blob in blobs])[np.newaxis, :]
+    centers_y = np.array([blob[2] for blob in blobs])[np.newaxis, :]
+    radii = np.array([blob[3] for blob in blobs])[np.newaxis, :]
+    half = np.sqrt(np.maximum(radii ** 2 - (rows[:, np.newaxis] - centers_y) ** 2, 0.0))
+    hit = (
+        (np.abs(rows[:, np.newaxis] - centers_y) < radii)
+        & (centers_x + half > 0) & (centers_x - half < width)
+    )
+    starts = np.where(hit, centers_x - half, np.inf)
+    ends = np.where(hit, centers_x + half, -np.inf)
+    starts[starts <= 0] = -np.inf
+    ends[ends >= width] = np.inf
+
+    # Split each row into segments at every chord endpoint and find the
+    # topmost circle on each segment
+    points = np.sort(np.concatenate([starts, ends], axis=1), axis=1)
+    lefts = np.concatenate([np.full((len(rows), 1), -np.inf), points], axis=1)
+    rights = np.concatenate([points, np.full((len(rows), 1), np.inf)], axis=1)
+    with np.errstate(invalid="ignore"):
+        probes = np.where(
+            np.isfinite(lefts) & np.isfinite(rights), (lefts + rights) / 2.0,
+            np.where(np.isfinite(lefts), lefts + 1.0, rights - 1.0)
+        )
+    # Segments between two infinite points are empty
+    probes[~np.isfinite(probes)] = 0.0
+
+    colors = np.zeros(lefts.shape + (4,), dtype=np.float64)
+    for index, blob in enumerate(blobs):
+        inside = (starts[:, index:index + 1] <= probes) & (probes <= ends[:, index:index + 1])
+        colors[inside] = blob[0]
+
+    # Pillow's blur is PASSES box passes per axis, each extending the
+    # canvas edge of its own input; this follows it with Gaussian passes
+    pass_sigma = sigma / math.sqrt(PASSES)
+
+    # First pass across x: each segment adds its color times its blurred extent
+    blurred_rows = np.zeros((len(rows), len(grid_x), 4), dtype=np.float64)
+    x = grid_x[np.newaxis, :]
+    for segment in range(lefts.shape[1]):
+        color = colors[:, segment]
+        if not color.any():
+            continue
+        extent = (
+            _phi((x - lefts[:, segment:segment + 1]) / pass_sigma)
+            - _phi((x - rights[:, segment:segment + 1]) / pass_sigma)
+        )
+        blurred_rows += extent[:, :, np.newaxis] * color[:, np.newaxis, :]
+
+    # First pass down y, from the row bands onto the grid
+    grid = np.tensordot(
+        _clamped_weights(band_edges, grid_y, pass_sigma), blurred_rows, axes=(1, 0)
+    )
+
+    # The remaining passes run on the grid itself
+    cell_edges_x = np.minimum(np.arange(len(grid_x) + 1) * step, width).astype(np.float64)
+    cell_edges_y = np.minimum(np.arange(len(grid_y) + 1) * step, height).astype(np.float64)
+    across = np.linalg.matrix_power(
+        _clamped_weights(cell_edges_x, grid_x, pass_sigma), PASSES - 1
+    )
+    down = np.linalg.matrix_power(
+        _clamped_weights(cell_edges_y, grid_y, pass_sigma), PASSES - 1
+    )
+    grid = np.tensordot(down, grid, axes=(1, 0))
+    grid = np.einsum("ij,yjc->yic", across, grid).astype(np.float32)
+
+    grid += 0.5
+    np.clip(grid, 0, 255, out=grid)
+    image = Image.fromarray(grid.astype(np.uint8), mode="RGBA")
+    if step == 1:
+        return image
+
+    # Upsample band by band; resizing RGBA would premultiply alpha
+    return Image.merge("RGBA", [
+        band_image.resize(
+            (width, height),
+            Image.Resampling.BICUBIC,
+            box=(0, 0, width / step, height / step)
+        )
+        for band_image in image.split()
+    ])
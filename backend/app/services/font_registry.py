@@ -0,0 +1,400 @@
+"""Font faces by family and weight, with per-character fallback
+
+The font directories are scanned once, in the main process; worker
+processes get the scanned faces with their pool's initializer instead of
+scanning again. Every face in the app's fonts, and the fallback families
+among the system fonts, is read with fontTools for its family name,
+weight (or, for variable fonts, the range of its wght axis), italic flag
+and cmap. The cmap is kept as a
+coverage bitmap, one bit per codepoint, so finding the face that has a
+glyph for a character is a bit test rather than rendering and checking
+for tofu.
+
+A family and weight resolve to the nearest face by the CSS font matching
+rules, or to the exact weight on a variable font's axis. A FontChain is
+that face followed by the same weight of each fallback family. Text is
+split into runs, each drawn in the first face of the chain that covers
+its characters.
+
+FreeType handles are not safe to share between threads, so each thread
+opens its own, in a bounded per-thread cache.
+"""
+import os
+import threading
+import unicodedata
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from fontTools.ttLib import TTCollection, TTFont
+from PIL import ImageFont
+
+# Searched after the app's own fonts, for fallback faces
+FONT_DIRS = [
+    path for path in os.environ.get(
+        "FONT_DIRS", os.pathsep.join(["/usr/share/fonts", "/usr/local/share/fonts"])
+    ).split(os.pathsep) if path
+]
+
+# Tried in order for characters the requested family has no glyph for
+FALLBACK_FAMILIES = [
+    family.strip() for family in os.environ.get(
+        "FALLBACK_FONTS",
+        "Noto Sans,Noto Sans CJK SC,Noto Sans CJK JP,Noto Sans CJK KR,"
+        "Noto Sans Thai,Noto Sans Devanagari,Noto Sans Arabic,Noto Sans Hebrew,"
+        "DejaVu Sans"
+    ).split(",") if family.strip()
+]
+
+# Used for families that aren't installed
+DEFAULT_FAMILY = os.environ.get("DEFAULT_FONT", "DejaVu Sans")
+
+# Open font handles kept per thread
+MAX_HANDLES_PER_THREAD = 64
+
+FONT_EXTENSIONS = (".ttf", ".otf", ".ttc", ".otc")
+
+_registries: Dict[Tuple[str, ...], "FontRegistry"] = {}
+_registries_lock = threading.Lock()
+
+
+def covers(coverage: bytes, char: str) -> bool:
+    """Whether a coverage bitmap has a glyph for char"""
+    code = ord(char)
+    index = code >> 3
+    return index < len(coverage) and bool(coverage[index] >> (code & 7) & 1)
+
+
+def _coverage(cmap: Dict[int, str]) -> bytes:
+    codes = np.fromiter(cmap.keys(), dtype=np.int64)
+    bits = np.zeros(int(codes.max()) + 1, dtype=bool)
+    bits[codes] = True
+    return np.packbits(bits, bitorder="little").tobytes()
+
+
+def _weight_distance(target: int, weight: int) -> int:
+    """Rank of weight when target is requested, lowest first
+
+    The CSS font matching order: from 400 to 500, heavier weights up to
+    500 first, then lighter ones, then heavier; below 400 lighter first;
+    above 500 heavier first.
+    """
+    if weight == target:
+        return 0
+    if 400 <= target <= 500:
+        if target < weight <= 500:
+            return weight - target
+        if weight < target:
+            return 1000 + target - weight
+        return 2000 + weight
+    if (weight < target) == (target < 400):
+        return abs(target - weight)
+    return 1000 + abs(target - weight)
+
+
+def _is_attached(char: str) -> bool:
+    """Marks, joiners and spaces stay in the face of the character before"""
+    return char.isspace() or unicodedata.category(char) in ("Mn", "Mc", "Me", "Cf")
+
+
+def _read_face(
+    font: TTFont, path: str, index: int, families: Optional[set] = None
+) -> Optional[dict]:
+    family = font["name"].getBestFamilyName()
+    if families is not None and (family or "").lower() not in families:
+        return None
+    cmap = font.getBestCmap()
+    if not cmap:
+        return None
+
+    face = {
+        "path": path,
+        "index": index,
+        "family": family,
+        "weight": 400,
+        "italic": False,
+        "weight_axis": None,
+        "coverage": _coverage(cmap)
+    }
+    if "OS/2" in font:
+        face["weight"] = font["OS/2"].usWeightClass
+        face["italic"] = bool(font["OS/2"].fsSelection & 1)
+    elif "head" in font:
+        face["italic"] = bool(font["head"].macStyle & 2)
+
+    if "fvar" in font:
+        axes = font["fvar"].axes
+        for axis_index, axis in enumerate(axes):
+            if axis.axisTag == "wght":
+                face["weight_axis"] = {
+                    "index": axis_index,
+                    "minimum": axis.minValue,
+                    "maximum": axis.maxValue,
+                    "defaults": [other.defaultValue for other in axes]
+                }
+                face["weight"] = int(axis.defaultValue)
+    return face
+
+
+def _read_faces(path: str, families: Optional[set] = None) -> List[dict]:
+    """Faces in a font file, only of families if given; collections hold several"""
+    if path.lower().endswith((".ttc", ".otc")):
+        collection = TTCollection(path, lazy=True)
+        fonts = list(collection.fonts)
+    else:
+        fonts = [TTFont(path, lazy=True)]
+
+    faces = []
+    for index, font in enumerate(fonts):
+        face = _read_face(font, path, index, families)
+        if face is not None:
+            faces.append(face)
+        font.close()
+    return faces
+
+
+class FontChain:
+    """A face and its fallbacks at one size, used like a single font
+
+    Measures and draws each character in the first face that covers it.
+    Not thread-safe; get one per thread from FontRegistry.font_chain.
+    """
+
+    def __init__(self, registry: "FontRegistry", faces: List[dict], size: int, weight: int):
+        self.registry = registry
+        self.faces = faces
+        self.size = size
+        self.weight = weight
+        self.key = ("chain",) + tuple(
+            (face["path"], face["index"], registry.instance_weight(face, weight))
+            for face in faces
+        ) + (size,)
+        self._fonts: Dict[int, ImageFont.FreeTypeFont] = {}
+        self._choices: Dict[str, int] = {}
+
+    def font(self, face_index: int) -> ImageFont.FreeTypeFont:
+        font = self._fonts.get(face_index)
+        if font is None:
+            font = self._fonts[face_index] = self.registry.open(
+                self.faces[face_index], self.size, self.weight
+            )
+        return font
+
+    def _face_for(self, char: str) -> int:
+        choice = self._choices.get(char)
+        if choice is None:
+            # Characters no face covers are drawn in the primary face
+            choice = 0
+            for face_index, face in enumerate(self.faces):
+                if covers(face["coverage"], char):
+                    choice = face_index
+                    break
+            self._choices[char] = choice
+        return choice
+
+    def runs(self, text: str) -> List[Tuple[str, ImageFont.FreeTypeFont]]:
+        """Split text into (run, font) pairs of characters sharing a face"""
+        runs = []
+        start = 0
+        current = None
+        for position, char in enumerate(text):
+            if (
+                current is not None and _is_attached(char)
+                and covers(self.faces[current]["coverage"], char)
+            ):
+                continue
+            face_index = self._face_for(char)
+            if face_index != current:
+                if current is not None:
+                    runs.append((text[start:position], self.font(current)))
+                start = position
+                current = face_index
+        if current is not None:
+            runs.append((text[start:], self.font(current)))
+        return runs
+
+    @property
+    def layout_engine(self) -> ImageFont.Layout:
+        return self.font(0).layout_engine
+
+    def getlength(self, text: str) -> float:
+        return sum(font.getlength(run) for run, font in self.runs(text))
+
+    def getmetrics(self) -> Tuple[int, int]:
+        return self.font(0).getmetrics()
+
+    def getbbox(self, text: str) -> Tuple[int, int, int, int]:
+        left, top, right, bottom = 0, 0, 0, 0
+        pen = 0.0
+        ascent = self.getmetrics()[0]
+        for run, font in self.runs(text):
+            # Runs share the primary face's baseline
+            shift = ascent - font.getmetrics()[0]
+            box = font.getbbox(run)
+            left = min(left, int(pen) + box[0])
+            top = min(top, box[1] + shift)
+            right = max(right, int(pen) + box[2])
+            bottom = max(bottom, box[3] + shift)
+            pen += font.getlength(run)
+        return left, top, right, bottom
+
+
+class FontRegistry:
+    """Installed font faces, indexed by family and weight
+
+    font_dirs are scanned in order, so a family found in an earlier
+    directory hides faces of the same family from later ones. Faces in
+    the first directory can also be found by their file name; later
+    directories only contribute DEFAULT_FAMILY and FALLBACK_FAMILIES.
+
+    Pickles as its scanned faces without open handles, so it can be
+    passed to worker processes.
+    """
+
+    def __init__(self, font_dirs: List[str]):
+        self.font_dirs = font_dirs
+        self.families: Dict[str, List[dict]] = {}
+        self._local = threading.local()
+        self._scan()
+
+    def __getstate__(self) -> dict:
+        return {"font_dirs": self.font_dirs, "families": self.families}
+
+    def __setstate__(self, state: dict):
+        self.font_dirs = state["font_dirs"]
+        self.families = state["families"]
+        self._local = threading.local()
+
+    def _scan(self):
+        fallbacks = {family.lower() for family in [DEFAULT_FAMILY] + FALLBACK_FAMILIES}
+        for position, directory in enumerate(self.font_dirs):
+            if not os.path.isdir(directory):
+                continue
+            # System directories are only read for the fallback families
+            wanted = None if position == 0 else fallbacks
+            found: Dict[str, List[dict]] = {}
+            for root, dirs, files in os.walk(directory):
+                dirs.sort()
+                for filename in sorted(files):
+                    if not filename.lower().endswith(FONT_EXTENSIONS):
+                        continue
+                    path = os.path.join(root, filename)
+                    try:
+                        faces = _read_faces(path, wanted)
+                    except Exception:
+                        continue
+                    for face in faces:
+                        found.setdefault(face["family"].lower(), []).append(face)
+                        # The app's fonts were looked up by file name before
+                        alias = os.path.splitext(filename)[0].lower()
+                        if position == 0 and alias != face["family"].lower():
+                            found.setdefault(alias, []).append(face)
+            for family, faces in found.items():
+                self.families.setdefault(family, faces)
+
+    def has_family(self, family: str) -> bool:
+        return family.lower() in self.families
+
+    def instance_weight(self, face: dict, weight: int) -> Optional[float]:
+        """Weight a variable face is set to for weight; None for static faces"""
+        axis = face["weight_axis"]
+        if axis is None:
+            return None
+        return min(max(weight, axis["minimum"]), axis["maximum"])
+
+    def face(self, family: str, weight: int = 400) -> Optional[dict]:
+        """Nearest face of family to weight, preferring upright faces"""
+        faces = self.families.get(family.lower())
+        if not faces:
+            return None
+
+        def rank(face: dict) -> tuple:
+            nearest = self.instance_weight(face, weight)
+            if nearest is None:
+                nearest = face["weight"]
+            return (face["italic"], _weight_distance(weight, int(round(nearest))))
+
+        return min(faces, key=rank)
+
+    def _handles(self) -> OrderedDict:
+        handles = getattr(self._local, "handles", None)
+        if handles is None:
+            handles = self._local.handles = OrderedDict()
+        return handles
+
+    def _cached(self, key: tuple, create):
+        handles = self._handles()
+        value = handles.get(key)
+        if value is None:
+            value = handles[key] = create()
+            if len(handles) > MAX_HANDLES_PER_THREAD:
+                handles.popitem(last=False)
+        else:
+            handles.move_to_end(key)
+        return value
+
+    def open(self, face: dict, size: int, weight: int = 400) -> ImageFont.FreeTypeFont:
+        """This thread's handle on face at size, set to weight if variable"""
+        instance = self.instance_weight(face, weight)
+
+        def create():
+            font = ImageFont.truetype(face["path"], size, index=face["index"])
+            if instance is not None:
+                axis = face["weight_axis"]
+                values = list(axis["defaults"])
+                values[axis["index"]] = instance
+                try:
+                    font.set_variation_by_axes(values)
+                except OSError:
+                    # FreeType built without variation support
+                    pass
+                # Part of text_layout.font_key, so each instance is
+                # measured and cached separately
+                font.variation = tuple(values)
+            return font
+
+        return self._cached(("font", face["path"], face["index"], size, instance), create)
+
+    def _fallback_faces(self, family: str, weight: int) -> List[dict]:
+        faces = []
+        for name in [family, DEFAULT_FAMILY] + FALLBACK_FAMILIES:
+            face = self.face(name, weight)
+            if face is not None and all(face is not other for other in faces):
+                faces.append(face)
+        return faces
+
+    def font(self, family: str, size: int, weight: int = 400) -> ImageFont.ImageFont:
+        """The face for family and weight, or the default family's"""
+        faces = self._fallback_faces(family, weight)
+        if not faces:
+            return ImageFont.load_default(size)
+        return self.open(faces[0], size, weight)
+
+    def font_chain(self, family: str, size: int, weight: int = 400) -> ImageFont.ImageFont:
+        """family at weight with fallbacks, as a FontChain
+
+        Without any installed faces, Pillow's default font.
+        """
+        def create():
+            faces = self._fallback_faces(family, weight)
+            if not faces:
+                return ImageFont.load_default(size)
+            return FontChain(self, faces, size, weight)
+
+        return self._cached(("chain", family.lower(), size, weight), create)
+
+
+def font_registry(fonts_path: str) -> FontRegistry:
+    """The process's registry for fonts_path and FONT_DIRS, scanned on first use"""
+    font_dirs = tuple([os.path.abspath(fonts_path)] + FONT_DIRS)
+    with _registries_lock:
+        registry = _registries.get(font_dirs)
+        if registry is None:
+            registry = _registries[font_dirs] = FontRegistry(list(font_dirs))
+    return registry
+
+
+def install_font_registry(registry: FontRegistry):
+    """Use a registry scanned in another process, so font_registry doesn't rescan"""
+    with _registries_lock:
+        _registries.setdefault(tuple(registry.font_dirs), registry)
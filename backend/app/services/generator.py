@@ -1,21 +1,45 @@
 """Screenshot generation service"""
+import copy
+import json
+import math
+import multiprocessing
 import os
+import shutil
 import uuid
 import zipfile
 import io
-from typing import List, Dict, Optional
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import BinaryIO, Callable, List, Dict, Optional, Tuple
 from PIL import Image
 
-from .image_processor import ImageProcessor
+from .font_registry import FontRegistry, install_font_registry
+from .image_io import check_pixels, decode_image
+from .image_processor import (
+    DEFAULT_QUALITY, QUALITY_PROFILES, ImageProcessor, resample_image
+)
+from .upload_store import CHUNK_SIZE, IncomingUpload, UploadIndex
 from ..data.devices import DEVICE_SPECS
 from ..data.templates import TEMPLATES
 from ..data.locales import LOCALES
 
+# Work units planned per export worker, so uneven units still balance out
+EXPORT_UNITS_PER_WORKER = 4
+
+# Scales of an upload kept as variants for previews, besides the variants
+# sized for each device screen
+UPLOAD_VARIANT_SCALES = (0.25, 0.5)
+
 
 class ScreenshotGenerator:
     """Handles screenshot generation and export"""
 
-    def __init__(self, upload_dir: str = None, output_dir: str = None):
+    def __init__(
+        self,
+        upload_dir: str = None,
+        output_dir: str = None,
+        export_workers: Optional[int] = None
+    ):
         self.upload_dir = upload_dir or os.path.join(
             os.path.dirname(__file__), "..", "..", "uploads"
         )
@@ -24,10 +48,20 @@ class ScreenshotGenerator:
         )
         self.processor = ImageProcessor()
 
+        # Export worker processes; 0 or 1 renders exports in this process
+        if export_workers is None:
+            export_workers = int(
+                os.environ.get("EXPORT_WORKERS", os.cpu_count() or 1)
+            )
+        self.export_workers = max(0, export_workers)
+        self._export_pool: Optional[ProcessPoolExecutor] = None
+
         # Ensure directories exist
         os.makedirs(self.upload_dir, exist_ok=True)
         os.makedirs(self.output_dir, exist_ok=True)
 
+        self.uploads = UploadIndex(self.upload_dir)
+
     def generate_preview(
         self,
         screenshot_config: dict,
@@ -35,158 +69,486 @@ class ScreenshotGenerator:
         width: int = 1290,
         height: int = 2796,
         screenshot_index: int = 0,
-        total_screenshots: int = 1
+        total_screenshots: int = 1,
+        panoramic_strips: Optional[Dict[tuple, Image.Image]] = None,
+        quality: str = DEFAULT_QUALITY,
+        scale: Optional[float] = None
+    ) -> bytes:
+        """Generate a preview image for a screenshot configuration
+
+        quality names a profile from QUALITY_PROFILES; the preview is
+        rendered and returned at its scale (or at scale, if given) of
+        width x height.
+        """
+        factor = _preview_scale(quality, scale)
+        width, height = _scaled_size(width, height, factor)
+        output = self.render_screenshot(
+            _scale_screenshot_config(screenshot_config, factor),
+            locale=locale,
+            width=width,
+            height=height,
+            screenshot_index=screenshot_index,
+            total_screenshots=total_screenshots,
+            panoramic_strips=panoramic_strips,
+            quality=quality
+        )
+
+        # Export as PNG bytes
+        return self.processor.export_to_size(output, width, height, "png", 95)
+
+    def generate_panoramic_preview(
+        self,
+        screenshots: List[dict],
+        locale: str = "en",
+        width: int = 1290,
+        height: int = 2796,
+        quality: str = DEFAULT_QUALITY,
+        scale: Optional[float] = None
     ) -> bytes:
-        """Generate a preview image for a screenshot configuration"""
+        """Generate one wide image showing every screenshot of a set side by side
+
+        quality and scale work as in generate_preview.
+        """
+        total_screenshots = len(screenshots)
+        panoramic_strips: Dict[tuple, Image.Image] = {}
+        factor = _preview_scale(quality, scale)
+        width, height = _scaled_size(width, height, factor)
+
+        output = Image.new("RGBA", (width * total_screenshots, height), (0, 0, 0, 0))
+        for idx, screenshot in enumerate(screenshots):
+            panel = self.render_screenshot(
+                _scale_screenshot_config(screenshot, factor),
+                locale=locale,
+                width=width,
+                height=height,
+                screenshot_index=idx,
+                total_screenshots=total_screenshots,
+                panoramic_strips=panoramic_strips,
+                quality=quality
+            )
+            output.paste(panel, (idx * width, 0))
+
+        return self.processor.export_to_size(
+            output, output.width, output.height, "png", 95
+        )
+
+    def render_screenshot(
+        self,
+        screenshot_config: dict,
+        locale: str = "en",
+        width: int = 1290,
+        height: int = 2796,
+        screenshot_index: int = 0,
+        total_screenshots: int = 1,
+        panoramic_strips: Optional[Dict[tuple, Image.Image]] = None,
+        quality: str = DEFAULT_QUALITY
+    ) -> Image.Image:
+        """Render a screenshot configuration to an image at the given size
+
+        panoramic_strips is an optional cache shared between calls so that a
+        panoramic background is rendered once for a whole set of screenshots.
+        """
+        output = self.render_base_layer(
+            screenshot_config,
+            width=width,
+            height=height,
+            screenshot_index=screenshot_index,
+            total_screenshots=total_screenshots,
+            panoramic_strips=panoramic_strips,
+            quality=quality
+        )
+        return self._draw_localized_texts(output, screenshot_config, locale, width, height)
+
+    def render_base_layer(
+        self,
+        screenshot_config: dict,
+        width: int = 1290,
+        height: int = 2796,
+        screenshot_index: int = 0,
+        total_screenshots: int = 1,
+        panoramic_strips: Optional[Dict[tuple, Image.Image]] = None,
+        quality: str = DEFAULT_QUALITY
+    ) -> Image.Image:
+        """Render the locale-invariant layer of a screenshot: background and device
+
+        The result can be reused for every locale with render_text_layer.
+        """
         # Get template config
         template_config = screenshot_config.get("template", {})
         device_config = screenshot_config.get("device", {})
         image_config = screenshot_config.get("image")
-        texts = screenshot_config.get("texts", [])
 
         # Create background
         bg_config = template_config.get("background", {"type": "solid", "color": "#FFFFFF"})
 
         # Check if panoramic mode is enabled
         if bg_config.get("panoramic", False) and total_screenshots > 1:
-            background = self.processor.create_panoramic_background(
-                width, height, bg_config, screenshot_index, total_screenshots
+            background = self._get_panoramic_panel(
+                bg_config, width, height, screenshot_index, total_screenshots,
+                panoramic_strips, quality
             )
         else:
-            background = self.processor.create_background(width, height, bg_config)
+            background = self.processor.create_background(
+                width, height, bg_config, quality
+            )
 
-        # Load screenshot image if provided
-        screen_image = None
+        # Screenshot file, if provided
+        image_path = None
         if image_config:
             # Use 'path' for local file path, fall back to 'url' for backwards compatibility
             image_path = image_config.get("path") or image_config.get("url")
-            if image_path and os.path.exists(image_path):
-                screen_image = Image.open(image_path).convert("RGBA")
-
-        # Create device frame if we have a screen image
-        device_frame = None
-        if screen_image:
-            device_frame = self.processor.create_device_frame(
-                screen_image,
-                device_config.get("model", "iphone-6.9"),
-                device_config.get("color", "natural-titanium"),
-                device_config.get("style", "realistic"),
-                device_config.get("shadow", True),
-                device_config.get("shadow_blur", 40),
-                device_config.get("shadow_opacity", 0.3)
-            )
 
+        # Just the background if no device image
+        if not image_path:
+            return background
+
+        # Lay the device out at its final on-canvas size up front
+        geometry = self.processor.plan_device_geometry(device_config, width, height)
+
+        # Decoded and fitted to the screen once per file and size, then cached
+        screen_size = (geometry["screen_width"], geometry["screen_height"])
+        fit = image_config.get("fit", "cover")
+        position = (image_config.get("position_x", 0.5), image_config.get("position_y", 0.5))
+        screen_image = self.processor.load_image(
+            self._screen_source(image_path, screen_size), screen_size, quality,
+            fit, position
+        )
+        if screen_image is None:
+            # Missing file
+            return background
+
+        device_frame = self.processor.create_device_frame(
+            screen_image,
+            device_config.get("model", "iphone-6.9"),
+            device_config.get("color", "natural-titanium"),
+            device_config.get("style", "realistic"),
+            device_config.get("shadow", True),
+            device_config.get("shadow_blur", 40),
+            device_config.get("shadow_opacity", 0.3),
+            geometry=geometry,
+            shadow_renderer=device_config.get("shadow_renderer", "raster"),
+            quality=quality,
+            fit=fit,
+            position=position
+        )
+
+        return self.processor.compose_device(
+            background,
+            device_frame,
+            device_config,
+            width,
+            height,
+            quality
+        )
+
+    def render_text_layer(
+        self,
+        base_layer: Image.Image,
+        screenshot_config: dict,
+        locale: str = "en",
+        width: int = 1290,
+        height: int = 2796
+    ) -> Image.Image:
+        """Draw one locale's texts on a copy of a base layer from render_base_layer"""
+        return self._draw_localized_texts(
+            base_layer.copy(), screenshot_config, locale, width, height
+        )
+
+    def _draw_localized_texts(
+        self,
+        image: Image.Image,
+        screenshot_config: dict,
+        locale: str,
+        width: int,
+        height: int
+    ) -> Image.Image:
+        """Draw the texts of a screenshot for a locale directly onto image"""
         # Prepare texts for the specified locale
         localized_texts = []
-        for text_item in texts:
+        for text_item in screenshot_config.get("texts", []):
             translations = text_item.get("translations", {})
             text_content = translations.get(locale, translations.get("en", ""))
             if text_content:
                 localized_texts.append({
                     "text": text_content,
                     "style": text_item.get("style", {}),
-                    "position_y": text_item.get("position_y", 0.1)
+                    "position_y": text_item.get("position_y", 0.1),
+                    "locale": locale
                 })
 
-        # Compose final image
-        if device_frame:
-            output = self.processor.compose_screenshot(
-                background,
-                device_frame,
-                localized_texts,
-                device_config,
-                width,
-                height
+        return self.processor.draw_texts(image, localized_texts, width, height)
+
+    def _get_panoramic_panel(
+        self,
+        bg_config: dict,
+        width: int,
+        height: int,
+        screenshot_index: int,
+        total_screenshots: int,
+        panoramic_strips: Optional[Dict[tuple, Image.Image]],
+        quality: str = DEFAULT_QUALITY
+    ) -> Image.Image:
+        """Cut a screenshot's panel from a panoramic strip, rendering it on first use"""
+        if panoramic_strips is None:
+            panoramic_strips = {}
+
+        key = (
+            width,
+            height,
+            total_screenshots,
+            json.dumps(bg_config, sort_keys=True, default=str),
+            quality
+        )
+        strip = panoramic_strips.get(key)
+        if strip is None:
+            strip = self.processor.create_panoramic_strip(
+                width, height, bg_config, total_screenshots, quality
             )
-        else:
-            # Just background with text if no device image
-            output = background
-            for text_config in localized_texts:
-                text = text_config.get("text", "")
-                if text:
-                    style = text_config.get("style", {})
-                    text_y = text_config.get("position_y", 0.1)
-                    text_x = width // 2
-                    text_y_px = int(height * text_y)
-                    output = self.processor.draw_text(
-                        output,
-                        text,
-                        (text_x, text_y_px),
-                        style,
-                        max_width=int(width * 0.85)
-                    )
+            panoramic_strips[key] = strip
 
-        # Export as PNG bytes
-        return self.processor.export_to_size(output, width, height, "png", 95)
+        return self.processor.crop_panoramic_panel(strip, width, screenshot_index)
 
     def generate_exports(
         self,
         project: dict,
-        export_config: dict
+        export_config: dict,
+        on_progress: Optional[Callable[[int, int], None]] = None
     ) -> str:
-        """Generate all exports for a project and return download path"""
+        """Generate all exports for a project and return download path
+
+        Rendering is split into independent work units that run on the export
+        process pool. Results are written to the ZIP by this process alone, in
+        unit order, so the archive layout does not depend on scheduling.
+        on_progress is called with (images_done, images_total) as units finish.
+        """
         job_id = str(uuid.uuid4())
         output_path = os.path.join(self.output_dir, f"{job_id}.zip")
 
+        units = self._plan_export_units(job_id, project, export_config)
+        total_images = sum(len(unit["locales"]) for unit in units)
+        done_images = 0
+
+        pool = self._get_export_pool() if len(units) > 1 else None
+        try:
+            if pool:
+                results = pool.map(_render_export_unit, units)
+            else:
+                results = self._render_export_units_inline(units)
+
+            # Create ZIP file
+            with zipfile.ZipFile(output_path, "w", zipfile.ZIP_DEFLATED) as zf:
+                for files in results:
+                    for filename, image_bytes in files:
+                        zf.writestr(filename, image_bytes)
+
+                    done_images += len(files)
+                    if on_progress:
+                        on_progress(done_images, total_images)
+        except BrokenProcessPool:
+            # A worker died (e.g. killed for memory); the next export
+            # starts a fresh pool
+            self._recycle_export_pool(pool)
+            raise
+
+        return output_path
+
+    def _plan_export_units(
+        self,
+        job_id: str,
+        project: dict,
+        export_config: dict
+    ) -> List[dict]:
+        """Split an export into independent work units
+
+        Each unit renders one screenshot for one device and a batch of
+        locales, so the base layer is shared within the batch. Locales are
+        batched finely enough to give every export worker several units.
+        """
         devices = export_config.get("devices", ["iphone-6.9"])
         locales = export_config.get("locales", ["en"])
         format_type = export_config.get("format", "png")
+        format_type = getattr(format_type, "value", format_type)
         quality = export_config.get("quality", 95)
         naming_pattern = export_config.get("naming_pattern", "{locale}/{device}/{index}")
 
         screenshots = project.get("screenshots", [])
         total_screenshots = len(screenshots)
 
-        # Create ZIP file
-        with zipfile.ZipFile(output_path, "w", zipfile.ZIP_DEFLATED) as zf:
-            for locale in locales:
-                for device_id in devices:
-                    device_spec = DEVICE_SPECS.get(device_id)
-                    if not device_spec:
-                        continue
-
-                    width = device_spec["width"]
-                    height = device_spec["height"]
-
-                    for idx, screenshot in enumerate(screenshots):
-                        # Generate screenshot for this device/locale
-                        # Pass panoramic info for continuous backgrounds
-                        image_bytes = self.generate_preview(
-                            screenshot,
-                            locale=locale,
-                            width=width,
-                            height=height,
-                            screenshot_index=idx,
-                            total_screenshots=total_screenshots
-                        )
-
-                        # Generate filename
-                        filename = naming_pattern.format(
-                            locale=locale,
-                            device=device_id,
-                            index=idx + 1
-                        )
-                        filename = f"{filename}.{format_type}"
-
-                        # Add to ZIP
-                        zf.writestr(filename, image_bytes)
+        device_ids = [d for d in devices if d in DEVICE_SPECS]
+        pairs = len(device_ids) * total_screenshots
+        if not pairs or not locales:
+            return []
 
-        return output_path
+        target_units = self.export_workers * EXPORT_UNITS_PER_WORKER
+        batches = max(1, min(len(locales), math.ceil(target_units / pairs)))
+        batch_size = math.ceil(len(locales) / batches)
 
-    def save_uploaded_image(self, file_content: bytes, filename: str) -> dict:
-        """Save uploaded image and return metadata"""
-        # Generate unique filename
-        file_id = str(uuid.uuid4())
-        ext = os.path.splitext(filename)[1].lower() or ".png"
-        save_path = os.path.join(self.upload_dir, f"{file_id}{ext}")
+        units = []
+        for device_id in device_ids:
+            device_spec = DEVICE_SPECS[device_id]
+            for idx, screenshot in enumerate(screenshots):
+                for start in range(0, len(locales), batch_size):
+                    units.append({
+                        "job_id": job_id,
+                        "device_id": device_id,
+                        "width": device_spec["width"],
+                        "height": device_spec["height"],
+                        "screenshot": screenshot,
+                        "screenshot_index": idx,
+                        "total_screenshots": total_screenshots,
+                        "locales": locales[start:start + batch_size],
+                        "format": format_type,
+                        "quality": quality,
+                        "naming_pattern": naming_pattern
+                    })
 
-        # Save file
-        with open(save_path, "wb") as f:
-            f.write(file_content)
+        return units
+
+    def render_export_unit(
+        self,
+        unit: dict,
+        panoramic_strips: Optional[Dict[tuple, Image.Image]] = None
+    ) -> List[Tuple[str, bytes]]:
+        """Render one export work unit and return its (filename, bytes) pairs"""
+        width = unit["width"]
+        height = unit["height"]
+        screenshot = unit["screenshot"]
+        idx = unit["screenshot_index"]
+
+        # Background and device are the same for every locale,
+        # so only the text layer is redrawn per locale
+        base_layer = self.render_base_layer(
+            screenshot,
+            width=width,
+            height=height,
+            screenshot_index=idx,
+            total_screenshots=unit["total_screenshots"],
+            panoramic_strips=panoramic_strips
+        )
+
+        files = []
+        for locale in unit["locales"]:
+            output = self.render_text_layer(
+                base_layer, screenshot, locale, width, height
+            )
+            image_bytes = self.processor.export_to_size(
+                output, width, height, unit["format"], unit["quality"]
+            )
+
+            # Generate filename
+            filename = unit["naming_pattern"].format(
+                locale=locale,
+                device=unit["device_id"],
+                index=idx + 1
+            )
+            files.append((f"{filename}.{unit['format']}", image_bytes))
 
-        # Get image dimensions
-        with Image.open(save_path) as img:
-            width, height = img.size
+        return files
+
+    def _render_export_units_inline(self, units: List[dict]):
+        """Render work units in this process, yielding results in unit order"""
+        panoramic_strips: Dict[tuple, Image.Image] = {}
+        current_device = None
+
+        for unit in units:
+            # Units are device-major; keep only the current device's strips
+            if unit["device_id"] != current_device:
+                current_device = unit["device_id"]
+                panoramic_strips = {}
+            yield self.render_export_unit(unit, panoramic_strips)
+
+    def _get_export_pool(self) -> Optional[ProcessPoolExecutor]:
+        """Get the shared export process pool, or None to render inline"""
+        if self.export_workers <= 1:
+            return None
+
+        if self._export_pool is None:
+            self._export_pool = ProcessPoolExecutor(
+                max_workers=self.export_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_export_worker,
+                initargs=(self.upload_dir, self.output_dir, self.processor.fonts)
+            )
+        return self._export_pool
+
+    def _recycle_export_pool(self, pool: ProcessPoolExecutor):
+        """Drop a broken export pool so the next export replaces it"""
+        if self._export_pool is not pool:
+            return
+        self._export_pool = None
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    def close(self):
+        """Shut down the export process pool"""
+        if self._export_pool is not None:
+            self._export_pool.shutdown(cancel_futures=True)
+            self._export_pool = None
+
+    def save_uploaded_image(
+        self,
+        source: BinaryIO,
+        filename: str,
+        content_type: Optional[str] = None,
+        max_size: Optional[int] = None
+    ) -> dict:
+        """Stream an uploaded image into its shard, index it and return metadata
+
+        source is read in CHUNK_SIZE pieces while being hashed.
+        UploadTooLarge is raised as soon as it passes max_size bytes. See
+        store_upload for the rest.
+        """
+        incoming = IncomingUpload(self.upload_dir, max_size)
+        try:
+            while True:
+                chunk = source.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                incoming.write(chunk)
+            incoming.close()
+            return self.store_upload(incoming, filename, content_type)
+        finally:
+            incoming.discard()
+
+    def store_upload(
+        self,
+        incoming: IncomingUpload,
+        filename: str,
+        content_type: Optional[str] = None
+    ) -> dict:
+        """Move a fully received upload into its shard, index it and return metadata
+
+        ImageTooLarge is raised if its header has too many pixels. The file
+        ID is the content hash, so a file that was uploaded before is not
+        stored twice; "deduplicated" tells whether that happened.
+        """
+        temp_path = incoming.path
+        size = incoming.size
+        try:
+            # Opening only parses the header; no pixel data is decoded
+            try:
+                with Image.open(temp_path) as img:
+                    width, height = img.size
+                    content_type = content_type or Image.MIME.get(img.format)
+            except (OSError, SyntaxError):
+                raise ValueError("Not a readable image")
+            check_pixels((width, height))
+
+            file_id = incoming.digest.hexdigest()
+            entry = self.uploads.get(file_id)
+            deduplicated = entry is not None and os.path.exists(entry["path"])
+            if deduplicated:
+                save_path = entry["path"]
+            else:
+                ext = os.path.splitext(filename or "")[1].lower() or ".png"
+                shard_dir = self.uploads.shard_dir(file_id)
+                os.makedirs(shard_dir, exist_ok=True)
+                save_path = os.path.join(shard_dir, f"{file_id}{ext}")
+                os.replace(temp_path, save_path)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+        self.uploads.add(file_id, save_path, size, width, height, content_type)
 
         return {
             "id": file_id,
@@ -194,15 +556,183 @@ class ScreenshotGenerator:
             "path": save_path,
             "filename": filename,
             "width": width,
-            "height": height
+            "height": height,
+            "deduplicated": deduplicated
         }
 
+    def build_upload_variants(self, file_id: str, path: str) -> List[Tuple[int, int]]:
+        """Precompute downscaled RGBA copies of an upload
+
+        One variant per device screen size, just large enough to cover that
+        screen while keeping the upload's aspect ratio, plus the
+        UPLOAD_VARIANT_SCALES of the original. They are stored as
+        variants/<file_id>/<width>x<height>.png in the upload's shard.
+        Returns the variant sizes.
+        """
+        with Image.open(path) as source:
+            width, height = source.size
+
+        sizes = set()
+        for spec in DEVICE_SPECS.values():
+            factor = max(spec["screen_width"] / width, spec["screen_height"] / height)
+            if factor < 1:
+                sizes.add((
+                    min(width, math.ceil(width * factor)),
+                    min(height, math.ceil(height * factor))
+                ))
+        for factor in UPLOAD_VARIANT_SCALES:
+            sizes.add(_scaled_size(width, height, factor))
+
+        # Decode once, reduced toward the largest variant
+        image = decode_image(path, (
+            max(size[0] for size in sizes), max(size[1] for size in sizes)
+        ))
+
+        variant_dir = self._variant_dir(file_id)
+        os.makedirs(variant_dir, exist_ok=True)
+        for size in sizes:
+            variant = resample_image(image, size)
+
+            # Write under a temporary name so renders never see a partial file
+            variant_path = os.path.join(variant_dir, f"{size[0]}x{size[1]}.png")
+            temp_path = variant_path + ".tmp"
+            variant.save(temp_path, format="PNG", compress_level=1)
+            os.replace(temp_path, variant_path)
+
+        return sorted(sizes)
+
+    def _variant_dir(self, file_id: str) -> str:
+        return os.path.join(self.uploads.shard_dir(file_id), "variants", file_id)
+
+    def _screen_source(self, image_path: str, size: Tuple[int, int]) -> str:
+        """Smallest upload variant that still covers size, else the file itself"""
+        file_id = os.path.splitext(os.path.basename(image_path))[0]
+        if os.path.dirname(os.path.abspath(image_path)) != self.uploads.shard_dir(file_id):
+            return image_path
+
+        variant_dir = self._variant_dir(file_id)
+        try:
+            names = os.listdir(variant_dir)
+        except OSError:
+            return image_path
+
+        best = None
+        for name in names:
+            stem, ext = os.path.splitext(name)
+            try:
+                variant_width, variant_height = (int(v) for v in stem.split("x"))
+            except ValueError:
+                continue
+            if ext != ".png":
+                continue
+            if variant_width < size[0] or variant_height < size[1]:
+                continue
+            if best is None or variant_width * variant_height < best[0]:
+                best = (variant_width * variant_height, name)
+
+        return os.path.join(variant_dir, best[1]) if best else image_path
+
+    def get_uploaded_image(self, file_id: str) -> Optional[dict]:
+        """Index entry for an uploaded image, or None if there is none"""
+        return self.uploads.get(file_id)
+
     def delete_uploaded_image(self, file_id: str) -> bool:
-        """Delete an uploaded image"""
-        # Find and delete file with this ID
-        for filename in os.listdir(self.upload_dir):
-            if filename.startswith(file_id):
-                filepath = os.path.join(self.upload_dir, filename)
-                os.remove(filepath)
-                return True
-        return False
+        """Delete an uploaded image
+
+        The stored file and its variants stay until every upload of the same
+        content has been deleted.
+        """
+        entry = self.uploads.remove(file_id)
+        if entry is None:
+            return False
+        if entry["refs"] > 0:
+            return True
+
+        try:
+            os.remove(entry["path"])
+        except FileNotFoundError:
+            pass
+        shutil.rmtree(self._variant_dir(file_id), ignore_errors=True)
+        return True
+
+
+def _preview_scale(quality: str, scale: Optional[float]) -> float:
+    """Canvas scale for a preview: the explicit scale, else the profile's"""
+    if scale is None:
+        scale = QUALITY_PROFILES[quality]["scale"]
+    return min(max(scale, 0.05), 1.0)
+
+
+def _scaled_size(width: int, height: int, factor: float) -> Tuple[int, int]:
+    return max(1, round(width * factor)), max(1, round(height * factor))
+
+
+def _scale_screenshot_config(screenshot_config: dict, factor: float) -> dict:
+    """Copy of a screenshot config with its pixel sizes scaled by factor
+
+    Positions and device sizes are already relative to the canvas; font
+    sizes, text box padding and background blur radii are in pixels.
+    """
+    if factor == 1:
+        return screenshot_config
+    config = copy.deepcopy(screenshot_config)
+
+    background = (config.get("template") or {}).get("background") or {}
+    if background.get("type") == "blobs":
+        background["blur"] = background.get("blur", 150) * factor
+    elif background.get("type") == "glassmorphism":
+        background["blob_blur"] = background.get("blob_blur", 150) * factor
+
+    for text in config.get("texts", []):
+        style = text.get("style")
+        if not style:
+            continue
+        style["font_size"] = max(1, round(style.get("font_size", 48) * factor))
+        style["letter_spacing"] = style.get("letter_spacing", 0) * factor
+
+        text_background = style.get("background")
+        if text_background:
+            text_background["padding"] = round(text_background.get("padding", 8) * factor)
+            text_background["border_radius"] = round(
+                text_background.get("border_radius", 4) * factor
+            )
+
+    return config
+
+
+# Per-process state for export pool workers
+_worker_generator: Optional[ScreenshotGenerator] = None
+_worker_strip_owner: Optional[Tuple[str, str]] = None
+_worker_panoramic_strips: Dict[tuple, Image.Image] = {}
+
+
+def _init_export_worker(upload_dir: str, output_dir: str, fonts: FontRegistry):
+    """Create the generator used by an export worker process
+
+    fonts is the parent's registry, so the worker doesn't scan the font
+    directories again.
+    """
+    global _worker_generator
+    install_font_registry(fonts)
+    _worker_generator = ScreenshotGenerator(
+        upload_dir=upload_dir, output_dir=output_dir, export_workers=0
+    )
+
+    # Optionally prebuild device frame sprites (size FRAME_ASSET_CACHE_MB to fit)
+    if os.environ.get("FRAME_ASSET_WARMUP"):
+        _worker_generator.processor.warm_frame_assets()
+
+
+def _render_export_unit(unit: dict) -> List[Tuple[str, bytes]]:
+    """Render an export work unit inside a worker process
+
+    Panoramic strips are kept across consecutive units of the same job and
+    device, so a worker renders each strip about once per device.
+    """
+    global _worker_strip_owner, _worker_panoramic_strips
+    owner = (unit["job_id"], unit["device_id"])
+    if owner != _worker_strip_owner:
+        _worker_strip_owner = owner
+        _worker_panoramic_strips = {}
+
+    return _worker_generator.render_export_unit(unit, _worker_panoramic_strips)
@@ -0,0 +1,182 @@
+"""Text drawing from cached glyph masks
+
+ImageDraw.text rasterizes every glyph of a line each time it is drawn,
+and exports draw the same headlines in the same fonts for every device
+and locale. Here each (font, size, glyph) is rasterized once into a
+cached coverage mask. A line is assembled by placing those masks at the
+pen positions from cached advances and kerning, and the line mask is
+cached in turn, so drawing a repeated line is one bitmap composite.
+
+Glyphs are merged by taking the maximum coverage, as Pillow's own text
+rendering does. Under Pillow's basic layout, and without letter spacing,
+the result matches ImageDraw.text pixel for pixel. Letter spacing adds a
+fixed number of pixels between characters, skipping combining marks and
+joiners (see text_layout.takes_spacing). Lines in a FontChain are
+assembled from the glyphs of each run's face.
+
+Placing glyphs one by one can't do bidi reordering, Arabic joining,
+Indic conjuncts or mark positioning, so with raqm, lines that need those
+(text_layout.needs_shaping) are drawn by ImageDraw.text instead.
+"""
+import os
+from typing import Optional, Tuple
+
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont
+
+from .font_registry import FontChain
+from .render_cache import LRUCache, image_nbytes
+from .text_layout import font_key, needs_shaping, segment_advance, takes_spacing
+
+# Memory budget for rasterized glyphs, per process
+GLYPH_CACHE_BYTES = int(os.environ.get("GLYPH_CACHE_MB", 32)) * 1024 * 1024
+
+# Memory budget for assembled line masks, per process
+LINE_CACHE_BYTES = int(os.environ.get("TEXT_LINE_CACHE_MB", 64)) * 1024 * 1024
+
+_glyphs = LRUCache(GLYPH_CACHE_BYTES, lambda glyph: glyph[0].nbytes + 64)
+_lines = LRUCache(LINE_CACHE_BYTES, lambda line: image_nbytes(line[0]) + 64)
+_kerning = {}
+
+
+def _glyph(font: ImageFont.FreeTypeFont, key: tuple, char: str) -> tuple:
+    """Coverage mask of one glyph and its (left, top) offset from the pen
+
+    The pen is at the left end of the line's ascender, as for
+    ImageDraw.text's default anchor. Glyphs without ink have no mask.
+    """
+    cache_key = (key, char)
+    glyph = _glyphs.get(cache_key)
+    if glyph is None:
+        left, top, right, bottom = font.getbbox(char)
+        mask = None
+        if right > left and bottom > top:
+            image = Image.new("L", (right - left, bottom - top), 0)
+            ImageDraw.Draw(image).text((-left, -top), char, font=font, fill=255)
+            mask = np.asarray(image)
+        glyph = (mask if mask is not None else np.zeros((0, 0), np.uint8), left, top)
+        _glyphs.put(cache_key, glyph)
+    return glyph
+
+
+def _kern(font: ImageFont.FreeTypeFont, key: tuple, first: str, second: str) -> float:
+    """Kerning between two characters, measured once"""
+    cache_key = (key, first, second)
+    kerning = _kerning.get(cache_key)
+    if kerning is None:
+        kerning = (
+            font.getlength(first + second)
+            - segment_advance(font, key, first)
+            - segment_advance(font, key, second)
+        )
+        if len(_kerning) >= 65536:
+            _kerning.clear()
+        _kerning[cache_key] = kerning
+    return kerning
+
+
+def line_mask(
+    text: str, font: ImageFont.FreeTypeFont, letter_spacing: float = 0.0
+) -> Tuple[Optional[Image.Image], Tuple[int, int]]:
+    """Coverage mask of a line of text and its offset from the pen
+
+    font may be a FontChain, whose runs are drawn in their own faces on
+    the primary face's baseline. Returns (None, (0, 0)) for a line without
+    ink.
+    """
+    cache_key = (font_key(font), text, letter_spacing)
+    line = _lines.get(cache_key)
+    if line is not None:
+        return line
+
+    if isinstance(font, FontChain):
+        runs = font.runs(text)
+    else:
+        runs = [(text, font)]
+    ascent = font.getmetrics()[0]
+
+    # Pen position of every glyph
+    placed = []
+    pen = 0.0
+    previous = None
+    for run, run_font in runs:
+        key = font_key(run_font)
+        shift = ascent - run_font.getmetrics()[0]
+        for char in run:
+            if previous is not None:
+                if takes_spacing(previous[1], char):
+                    pen += letter_spacing
+                if previous[0] is run_font:
+                    pen += _kern(run_font, key, previous[1], char)
+            mask, left, top = _glyph(run_font, key, char)
+            if mask.size:
+                placed.append((mask, int(round(pen)) + left, top + shift))
+            pen += segment_advance(run_font, key, char)
+            previous = (run_font, char)
+
+    if not placed:
+        line = (None, (0, 0))
+    else:
+        left = min(x for _, x, _ in placed)
+        top = min(y for _, _, y in placed)
+        right = max(x + mask.shape[1] for mask, x, _ in placed)
+        bottom = max(y + mask.shape[0] for mask, _, y in placed)
+
+        coverage = np.zeros((bottom - top, right - left), dtype=np.uint8)
+        for mask, x, y in placed:
+            region = coverage[y - top:y - top + mask.shape[0], x - left:x - left + mask.shape[1]]
+            np.maximum(region, mask, out=region)
+        line = (Image.fromarray(coverage, mode="L"), (left, top))
+
+    _lines.put(cache_key, line)
+    return line
+
+
+def _draw_shaped(
+    image: Image.Image,
+    position: Tuple[int, int],
+    text: str,
+    font: ImageFont.FreeTypeFont,
+    fill: tuple
+):
+    """Draw a line through Pillow's layout engine, without letter spacing
+
+    A FontChain's runs are shaped one by one on the primary face's
+    baseline, in logical order.
+    """
+    draw = ImageDraw.Draw(image)
+    if not isinstance(font, FontChain):
+        draw.text(position, text, font=font, fill=fill)
+        return
+
+    ascent = font.getmetrics()[0]
+    pen = float(position[0])
+    for run, run_font in font.runs(text):
+        shift = ascent - run_font.getmetrics()[0]
+        draw.text((pen, position[1] + shift), run, font=run_font, fill=fill)
+        pen += run_font.getlength(run)
+
+
+def draw_line(
+    image: Image.Image,
+    position: Tuple[int, int],
+    text: str,
+    font: ImageFont.ImageFont,
+    fill: tuple,
+    letter_spacing: float = 0.0
+):
+    """Draw one line of text with its pen at position"""
+    if not isinstance(font, (ImageFont.FreeTypeFont, FontChain)):
+        # Bitmap fonts have no outlines to cache; draw them directly
+        ImageDraw.Draw(image).text(position, text, font=font, fill=fill)
+        return
+
+    if needs_shaping(font, text):
+        _draw_shaped(image, position, text, font, fill)
+        return
+
+    mask, (left, top) = line_mask(text, font, letter_spacing)
+    if mask is not None:
+        ImageDraw.Draw(image).bitmap(
+            (position[0] + left, position[1] + top), mask, fill=fill
+        )
@@ -0,0 +1,125 @@
+"""Size-aware decoding of image files
+
+Uploads and background images are often far larger than the size they
+are drawn at. When the target size is known, JPEGs are decoded straight
+to a 1/2, 1/4 or 1/8 scale in the DCT domain (Pillow's draft mode), and
+other formats are box-reduced by an integer factor right after decoding,
+so the final resample works on a much smaller image. Both steps keep the
+image at least as large as the target.
+
+The pixel count is checked against MAX_IMAGE_PIXELS from the file header,
+before any pixel data is read. Pillow's own decompression bomb check is
+set to the same limit, as a backstop for images opened elsewhere.
+"""
+import math
+import os
+from typing import Optional, Tuple
+
+from PIL import Image
+
+# Largest image, in pixels, that will be decoded
+MAX_IMAGE_PIXELS = int(os.environ.get("MAX_IMAGE_PIXELS", 100_000_000))
+
+# Integer reduction stops while the image is still this many times the
+# target size, leaving the rest to the resampling filter
+REDUCING_GAP = 2
+
+Image.MAX_IMAGE_PIXELS = MAX_IMAGE_PIXELS
+
+
+class ImageTooLarge(ValueError):
+    """Raised when an image has more pixels than MAX_IMAGE_PIXELS"""
+
+    def __init__(self, size: Tuple[int, int]):
+        super().__init__(
+            f"Image is {size[0]}x{size[1]}, larger than {MAX_IMAGE_PIXELS} pixels"
+        )
+        self.size = size
+
+
+def check_pixels(size: Tuple[int, int]):
+    """Raise ImageTooLarge if an image of size is over the pixel ceiling"""
+    if size[0] * size[1] > MAX_IMAGE_PIXELS:
+        raise ImageTooLarge(size)
+
+
+def fit_layout(
+    source_size: Tuple[int, int],
+    size: Tuple[int, int],
+    fit: str = "fill",
+    position: Tuple[float, float] = (0.5, 0.5)
+) -> Tuple[Tuple[float, float, float, float], Tuple[int, int], Tuple[int, int]]:
+    """Place an image of source_size in a size box with a fit mode
+
+    "fill" stretches the whole image over the box, "cover" crops it to the
+    box's aspect ratio and "contain" fits all of it inside, leaving bars.
+    position (0 to 1 on each axis) picks which part stays when cropping and
+    where the image sits between the bars.
+
+    Returns the visible region of the source as a (left, top, right,
+    bottom) box, the size that region is resampled to, and its offset
+    within the size box.
+    """
+    source_width, source_height = source_size
+    width, height = size
+    position_x, position_y = position
+
+    if fit == "cover":
+        scale = max(width / source_width, height / source_height)
+        # Rounded so a source that already has the box's aspect ratio
+        # isn't cropped by a rounding error
+        crop_width = min(source_width, round(width / scale, 6))
+        crop_height = min(source_height, round(height / scale, 6))
+        left = (source_width - crop_width) * position_x
+        top = (source_height - crop_height) * position_y
+        return (left, top, left + crop_width, top + crop_height), size, (0, 0)
+
+    if fit == "contain":
+        scale = min(width / source_width, height / source_height)
+        scaled = (
+            min(width, max(1, round(source_width * scale))),
+            min(height, max(1, round(source_height * scale)))
+        )
+        offset = (
+            round((width - scaled[0]) * position_x),
+            round((height - scaled[1]) * position_y)
+        )
+        return (0, 0, source_width, source_height), scaled, offset
+
+    return (0, 0, source_width, source_height), size, (0, 0)
+
+
+def decode_image(
+    path: str, size: Optional[Tuple[int, int]] = None, fit: str = "fill"
+) -> Image.Image:
+    """Decode an image file to RGBA, reduced toward size if given
+
+    The reduction keeps the part of the image that fit shows at least as
+    large as it will be drawn, so callers still resample it to the exact
+    size they need.
+    """
+    with Image.open(path) as source:
+        check_pixels(source.size)
+        if size is not None:
+            # Size the whole image would have when its visible part is
+            # drawn at size
+            box, scaled, _ = fit_layout(source.size, size, fit)
+            size = (
+                math.ceil(source.width * scaled[0] / (box[2] - box[0])),
+                math.ceil(source.height * scaled[1] / (box[3] - box[1]))
+            )
+
+            # No-op for formats other than JPEG
+            source.draft(source.mode, size)
+        image = source.convert("RGBA")
+
+    if size is not None:
+        factor = min(
+            image.width // max(1, size[0] * REDUCING_GAP),
+            image.height // max(1, size[1] * REDUCING_GAP)
+        )
+        if factor >= 2:
+            # Reduced premultiplied, so transparent pixels don't bleed color
+            image = image.convert("RGBa").reduce(factor).convert("RGBA")
+
+    return image
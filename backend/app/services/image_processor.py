@@ -1,12 +1,112 @@
 """Image processing service for screenshot generation"""
 import io
+import logging
 import math
 import os
 import random
 from typing import Optional, Tuple, List
-from PIL import Image, ImageDraw, ImageFilter, ImageFont
+from PIL import Image, ImageChops, ImageDraw, ImageFont
 import numpy as np
-from ..data.devices import DEVICE_SPECS
+from . import blur, noise
+from .image_io import decode_image, fit_layout
+from .blobs import MIN_SIGMA as MIN_BLOB_SIGMA, render_blobs
+from .shadows import rounded_rect_shadow
+from .font_registry import font_registry
+from .glyph_atlas import draw_line
+from .text_layout import layout_text
+from .render_cache import ImageCache, LRUCache, config_hash, image_nbytes
+from ..data.devices import DEVICE_SPECS, DEVICE_COLORS
+
+logger = logging.getLogger(__name__)
+
+# Number of entries in the precomputed color table used by gradient rendering
+GRADIENT_LUT_SIZE = 4096
+
+# Render quality profiles. Each renders the canvas at a fraction of its
+# requested size and resamples with its own filter; blurs use the blur
+# profile of the same name (see blur.py). Large reductions box-reduce by an
+# integer factor until the image is reducing_gap times the target size,
+# and resample from there.
+QUALITY_PROFILES = {
+    "draft": {"scale": 0.25, "resample": Image.Resampling.BILINEAR, "reducing_gap": 1.0},
+    "standard": {"scale": 0.5, "resample": Image.Resampling.BICUBIC, "reducing_gap": 2.0},
+    "final": {"scale": 1.0, "resample": Image.Resampling.LANCZOS, "reducing_gap": 2.0},
+}
+
+# Quality used for exports and whenever no profile is given
+DEFAULT_QUALITY = "final"
+
+# Fill for the bars around images placed with fit "contain"; screens show
+# them like a display that is switched off
+LETTERBOX_COLOR = (0, 0, 0, 255)
+
+# Mesh gradients are evaluated in bands of about this many pixels
+MESH_BAND_PIXELS = 1 << 16
+
+# Mesh gradients are sampled this many times per color point radius (at
+# most MESH_MAX_GRID_STEP pixels apart) and upsampled
+MESH_SAMPLES_PER_RADIUS = 32
+MESH_MAX_GRID_STEP = 32
+
+# Noise seed used when a noise config does not set one, so renders repeat
+DEFAULT_NOISE_SEED = 0
+
+# Memory budget for rendered backgrounds, per process
+BACKGROUND_CACHE_BYTES = int(os.environ.get("BACKGROUND_CACHE_MB", 256)) * 1024 * 1024
+
+# Memory budget for device frame sprites (bezel, shadow, screen mask), per process
+FRAME_ASSET_CACHE_BYTES = int(os.environ.get("FRAME_ASSET_CACHE_MB", 256)) * 1024 * 1024
+
+# Memory budget for decoded and pre-fitted image files, per process
+IMAGE_ASSET_CACHE_BYTES = int(os.environ.get("IMAGE_ASSET_CACHE_MB", 256)) * 1024 * 1024
+
+
+def resample_image(
+    image: Image.Image,
+    size: Tuple[int, int],
+    quality: str = DEFAULT_QUALITY,
+    box: Optional[Tuple[float, float, float, float]] = None
+) -> Image.Image:
+    """Resize image to size with the filter and reducing gap of a quality profile
+
+    box limits the resample to that region of image. Pillow ignores
+    reducing_gap for RGBA images, so those are resized premultiplied here,
+    as Pillow itself does for RGBA.
+    """
+    full = (0, 0) + image.size
+    box = tuple(box) if box is not None else full
+    if image.size == size and box == full:
+        return image
+
+    profile = QUALITY_PROFILES[quality]
+    options = {"box": box, "reducing_gap": profile["reducing_gap"]}
+    if image.mode == "RGBA":
+        return image.convert("RGBa").resize(
+            size, profile["resample"], **options
+        ).convert("RGBA")
+    return image.resize(size, profile["resample"], **options)
+
+
+def fit_image(
+    image: Image.Image,
+    size: Tuple[int, int],
+    quality: str = DEFAULT_QUALITY,
+    fit: str = "fill",
+    position: Tuple[float, float] = (0.5, 0.5)
+) -> Image.Image:
+    """Resample image into size with a fit mode (see image_io.fit_layout)
+
+    Only the visible part of the image is resampled, and "contain" pastes
+    it onto a size canvas of LETTERBOX_COLOR.
+    """
+    box, scaled, offset = fit_layout(image.size, size, fit, position)
+    fitted = resample_image(image, scaled, quality, box)
+    if scaled == size:
+        return fitted
+
+    canvas = Image.new("RGBA", size, LETTERBOX_COLOR)
+    canvas.paste(fitted, offset)
+    return canvas
 
 
 class ImageProcessor:
@@ -17,7 +117,13 @@ class ImageProcessor:
             os.path.dirname(__file__), "..", "assets"
         )
         self.fonts_path = os.path.join(self.assets_path, "fonts")
-        self._font_cache = {}
+        self.fonts = font_registry(self.fonts_path)
+        self.background_cache = ImageCache(BACKGROUND_CACHE_BYTES)
+        self.image_asset_cache = ImageCache(IMAGE_ASSET_CACHE_BYTES)
+        self.frame_asset_cache = LRUCache(
+            FRAME_ASSET_CACHE_BYTES,
+            lambda assets: image_nbytes(assets["base"]) + image_nbytes(assets["screen_mask"])
+        )
 
     def create_gradient(
         self,
@@ -46,8 +152,6 @@ class ImageProcessor:
         self, width: int, height: int, stops: List[dict], angle: float
     ) -> Image.Image:
         """Create a linear gradient"""
-        image = Image.new("RGBA", (width, height))
-
         # Convert angle to radians
         rad = math.radians(angle)
 
@@ -55,49 +159,28 @@ class ImageProcessor:
         cos_a = math.cos(rad)
         sin_a = math.sin(rad)
 
-        # Parse colors from stops
-        colors = [(self._parse_color(s["color"]), s["position"]) for s in stops]
-
-        for y in range(height):
-            for x in range(width):
-                # Calculate position along gradient (0 to 1)
-                # Normalize coordinates to -0.5 to 0.5
-                nx = x / width - 0.5
-                ny = y / height - 0.5
-
-                # Project onto gradient direction
-                t = (nx * sin_a + ny * cos_a + 0.5)
-                t = max(0, min(1, t))
+        # Normalize coordinates to -0.5 to 0.5 and project onto the gradient
+        # direction; the projection is separable so it is built from two 1D axes
+        nx = np.arange(width, dtype=np.float32) / width - 0.5
+        ny = np.arange(height, dtype=np.float32) / height - 0.5
+        t = (ny * cos_a + 0.5)[:, np.newaxis] + (nx * sin_a)[np.newaxis, :]
 
-                # Interpolate color
-                color = self._interpolate_color(colors, t)
-                image.putpixel((x, y), color)
-
-        return image
+        return self._render_gradient_field(t, stops)
 
     def _create_radial_gradient(
         self, width: int, height: int, stops: List[dict],
         center_x: float = 0.5, center_y: float = 0.5
     ) -> Image.Image:
         """Create a radial gradient with configurable center"""
-        image = Image.new("RGBA", (width, height))
-
         cx = int(width * center_x)
         cy = int(height * center_y)
         max_dist = math.sqrt(max(cx, width - cx)**2 + max(cy, height - cy)**2)
 
-        colors = [(self._parse_color(s["color"]), s["position"]) for s in stops]
+        dx = np.arange(width, dtype=np.float32) - cx
+        dy = np.arange(height, dtype=np.float32) - cy
+        dist = np.hypot(dy[:, np.newaxis], dx[np.newaxis, :])
 
-        for y in range(height):
-            for x in range(width):
-                dist = math.sqrt((x - cx)**2 + (y - cy)**2)
-                t = dist / max_dist
-                t = max(0, min(1, t))
-
-                color = self._interpolate_color(colors, t)
-                image.putpixel((x, y), color)
-
-        return image
+        return self._render_gradient_field(dist / max_dist, stops)
 
     def _create_mesh_gradient(
         self, width: int, height: int, color_points: List[dict]
@@ -106,111 +189,186 @@ class ImageProcessor:
 
         color_points: List of {"color": "#RRGGBB", "x": 0.0-1.0, "y": 0.0-1.0, "radius": 0.0-1.0}
         """
-        # Use numpy for faster computation
-        img_array = np.zeros((height, width, 4), dtype=np.float32)
-        weight_sum = np.zeros((height, width), dtype=np.float32)
+        if not color_points:
+            return Image.new("RGBA", (width, height), (0, 0, 0, 0))
 
+        colors = []
+        centers_x = []
+        centers_y = []
+        radii = []
         for point in color_points:
-            color = self._parse_color(point["color"])
-            px = int(point.get("x", 0.5) * width)
-            py = int(point.get("y", 0.5) * height)
-            radius = point.get("radius", 0.5) * max(width, height)
-
-            # Create distance field for this point
-            y_coords, x_coords = np.ogrid[:height, :width]
-            dist = np.sqrt((x_coords - px)**2 + (y_coords - py)**2)
-
-            # Gaussian falloff
-            weight = np.exp(-(dist**2) / (2 * radius**2))
-
-            # Add weighted color
-            for i in range(4):
-                img_array[:, :, i] += weight * color[i]
-            weight_sum += weight
+            # Each point carries its weight as a fifth channel
+            colors.append(self._parse_color(point["color"]) + (1,))
+            centers_x.append(int(point.get("x", 0.5) * width))
+            centers_y.append(int(point.get("y", 0.5) * height))
+            radii.append(point.get("radius", 0.5) * max(width, height))
+        colors = np.array(colors, dtype=np.float64)
+        centers_x = np.array(centers_x, dtype=np.float64)
+        centers_y = np.array(centers_y, dtype=np.float64)
+        radii = np.maximum(np.array(radii, dtype=np.float64), 1e-6)
+
+        # The field is very smooth, so it is sampled on a grid spaced a
+        # fraction of the smallest radius apart and upsampled
+        step = max(1, min(MESH_MAX_GRID_STEP, int(radii.min() / MESH_SAMPLES_PER_RADIUS)))
+        grid_width = -(-width // step)
+        grid_height = -(-height // step)
+        xs = (np.arange(grid_width) + 0.5) * step - 0.5
+        ys = (np.arange(grid_height) + 0.5) * step - 0.5
+
+        # Gaussian falloff is separable: exp(-d^2 / 2r^2) = wx(x) * wy(y)
+        weight_x = np.exp(-((xs[:, np.newaxis] - centers_x) ** 2) / (2 * radii ** 2))
+        weight_y = np.exp(-((ys[:, np.newaxis] - centers_y) ** 2) / (2 * radii ** 2))
+
+        # Accumulate colors and weights for all points at once, a band of
+        # rows at a time, so only the output is canvas sized
+        grid = np.empty((grid_height, grid_width, 4), dtype=np.uint8)
+        band_rows = max(1, MESH_BAND_PIXELS // grid_width)
+        for top in range(0, grid_height, band_rows):
+            band = np.einsum(
+                "yp,xp,pc->yxc",
+                weight_y[top:top + band_rows], weight_x, colors,
+                optimize=True
+            )
 
-        # Normalize
-        weight_sum = np.maximum(weight_sum, 0.0001)  # Avoid division by zero
-        for i in range(4):
-            img_array[:, :, i] /= weight_sum
+            # Normalize
+            band[:, :, :4] /= np.maximum(band[:, :, 4:], 0.0001)  # Avoid division by zero
+            np.clip(band[:, :, :4], 0, 255, out=band[:, :, :4])
+            grid[top:top + band_rows] = band[:, :, :4]
 
-        # Clip and convert to uint8
-        img_array = np.clip(img_array, 0, 255).astype(np.uint8)
+        image = Image.fromarray(grid, mode="RGBA")
+        if step == 1:
+            return image
 
-        return Image.fromarray(img_array, mode="RGBA")
+        # Upsample band by band; resizing RGBA would premultiply alpha
+        return Image.merge("RGBA", [
+            channel.resize(
+                (width, height),
+                Image.Resampling.BICUBIC,
+                box=(0, 0, width / step, height / step)
+            )
+            for channel in image.split()
+        ])
 
     def _create_conic_gradient(
         self, width: int, height: int, stops: List[dict],
         center_x: float = 0.5, center_y: float = 0.5, start_angle: float = 0
     ) -> Image.Image:
         """Create a conic (angular) gradient"""
-        image = Image.new("RGBA", (width, height))
-
         cx = int(width * center_x)
         cy = int(height * center_y)
 
-        colors = [(self._parse_color(s["color"]), s["position"]) for s in stops]
+        # Calculate angle from center
+        dx = np.arange(width, dtype=np.float32) - cx
+        dy = np.arange(height, dtype=np.float32) - cy
+        angle = np.arctan2(dy[:, np.newaxis], dx[np.newaxis, :])
 
-        for y in range(height):
-            for x in range(width):
-                # Calculate angle from center
-                angle = math.atan2(y - cy, x - cx)
-                # Normalize to 0-1, accounting for start angle
-                t = ((angle + math.pi - math.radians(start_angle)) / (2 * math.pi)) % 1.0
+        # Normalize to 0-1, accounting for start angle
+        t = np.mod(
+            (angle + (math.pi - math.radians(start_angle))) / (2 * math.pi), 1.0
+        )
 
-                color = self._interpolate_color(colors, t)
-                image.putpixel((x, y), color)
+        return self._render_gradient_field(t, stops)
 
-        return image
+    def _render_gradient_field(
+        self, t: np.ndarray, stops: List[dict]
+    ) -> Image.Image:
+        """Map a 2D field of gradient positions (0 to 1) to an RGBA image"""
+        lut = self._gradient_lut(stops)
+
+        # Round positions to the nearest table entry in place
+        t = np.clip(t, 0, 1)
+        t *= len(lut) - 1
+        t += 0.5
+        indices = t.astype(np.intp)
+
+        # Gather whole RGBA pixels at once through a packed 32-bit view
+        packed = lut.view(np.uint32).ravel()
+        pixels = packed[indices].view(np.uint8).reshape(t.shape + (4,))
+
+        return Image.fromarray(pixels, mode="RGBA")
+
+    def _gradient_lut(
+        self, stops: List[dict], size: int = GRADIENT_LUT_SIZE
+    ) -> np.ndarray:
+        """Sample the color stops into a (size, 4) uint8 lookup table
+
+        Positions outside the stops clamp to the end colors, and where stops
+        share a position the first segment containing it wins.
+        """
+        colors = [
+            (np.array(self._parse_color(s["color"]), dtype=np.float64), s["position"])
+            for s in stops
+        ]
+        t = np.linspace(0.0, 1.0, size)
+        lut = np.tile(colors[-1][0], (size, 1))
+
+        # Walk segments backwards so earlier segments overwrite later ones
+        for i in range(len(colors) - 2, -1, -1):
+            (c1, p1), (c2, p2) = colors[i], colors[i + 1]
+            mask = (t >= p1) & (t <= p2)
+            if p2 == p1:
+                lut[mask] = c1
+            else:
+                local_t = (t[mask] - p1) / (p2 - p1)
+                lut[mask] = c1 + (c2 - c1) * local_t[:, np.newaxis]
+
+        lut[t >= colors[-1][1]] = colors[-1][0]
+        lut[t <= colors[0][1]] = colors[0][0]
+
+        return np.floor(lut).astype(np.uint8)
 
     def _add_noise_texture(
         self, image: Image.Image, intensity: float = 0.05,
-        monochrome: bool = True
+        monochrome: bool = True, seed: int = DEFAULT_NOISE_SEED
     ) -> Image.Image:
-        """Add noise/grain texture to an image"""
-        img_array = np.array(image, dtype=np.float32)
-
-        if monochrome:
-            noise = np.random.randn(image.height, image.width, 1) * 255 * intensity
-            noise = np.repeat(noise, 3, axis=2)
-            noise = np.concatenate([noise, np.zeros((image.height, image.width, 1))], axis=2)
-        else:
-            noise = np.random.randn(image.height, image.width, 3) * 255 * intensity
-            noise = np.concatenate([noise, np.zeros((image.height, image.width, 1))], axis=2)
-
-        img_array[:, :, :3] = np.clip(img_array[:, :, :3] + noise[:, :, :3], 0, 255)
+        """Add noise/grain texture to an image
 
-        return Image.fromarray(img_array.astype(np.uint8), mode="RGBA")
+        The same seed always produces the same grain. Grain comes from a
+        per-process bank of tiles (see noise.py).
+        """
+        return noise.add_grain(image, intensity, monochrome, seed)
 
     def _create_abstract_blobs(
         self, width: int, height: int, blobs: List[dict],
-        blur_amount: int = 100
+        blur_amount: int = 100, quality: str = DEFAULT_QUALITY
     ) -> Image.Image:
         """Create abstract blob background with blur
 
         blobs: List of {"color": "#RRGGBB", "x": 0.0-1.0, "y": 0.0-1.0, "size": 0.0-1.0}
         """
-        image = Image.new("RGBA", (width, height), (0, 0, 0, 0))
-        draw = ImageDraw.Draw(image)
-
+        circles = []
         for blob in blobs:
             color = self._parse_color(blob["color"])
             x = int(blob.get("x", 0.5) * width)
             y = int(blob.get("y", 0.5) * height)
             size = int(blob.get("size", 0.3) * min(width, height))
+            circles.append((color, x, y, size))
+
+        # Heavy blurs are evaluated analytically from the circles. Pixel
+        # centers sit at +0.5, so this covers the same pixels as the
+        # ellipses below.
+        if blur_amount >= MIN_BLOB_SIGMA:
+            return render_blobs(
+                (width, height),
+                [(color, x + 0.5, y + 0.5, size + 0.5) for color, x, y, size in circles],
+                blur_amount
+            )
 
+        image = Image.new("RGBA", (width, height), (0, 0, 0, 0))
+        draw = ImageDraw.Draw(image)
+        for color, x, y, size in circles:
             # Draw ellipse for blob
             draw.ellipse(
                 [x - size, y - size, x + size, y + size],
                 fill=color
             )
 
-        # Apply heavy blur
-        image = image.filter(ImageFilter.GaussianBlur(blur_amount))
-
-        return image
+        # Apply blur
+        return blur.gaussian_blur(image, blur_amount, quality)
 
     def _create_glassmorphism_background(
-        self, width: int, height: int, config: dict
+        self, width: int, height: int, config: dict,
+        quality: str = DEFAULT_QUALITY
     ) -> Image.Image:
         """Create glassmorphism style background
 
@@ -238,38 +396,13 @@ class ImageProcessor:
         if blobs_config:
             blobs = self._create_abstract_blobs(
                 width, height, blobs_config,
-                config.get("blob_blur", 150)
+                config.get("blob_blur", 150),
+                quality
             )
             base = Image.alpha_composite(base, blobs)
 
         return base
 
-    def _interpolate_color(
-        self, colors: List[Tuple[Tuple[int, ...], float]], t: float
-    ) -> Tuple[int, ...]:
-        """Interpolate between color stops"""
-        if t <= colors[0][1]:
-            return colors[0][0]
-        if t >= colors[-1][1]:
-            return colors[-1][0]
-
-        # Find the two stops to interpolate between
-        for i in range(len(colors) - 1):
-            if colors[i][1] <= t <= colors[i + 1][1]:
-                # Calculate interpolation factor
-                range_t = colors[i + 1][1] - colors[i][1]
-                if range_t == 0:
-                    return colors[i][0]
-                local_t = (t - colors[i][1]) / range_t
-
-                c1, c2 = colors[i][0], colors[i + 1][0]
-                return tuple(
-                    int(c1[j] + (c2[j] - c1[j]) * local_t)
-                    for j in range(len(c1))
-                )
-
-        return colors[-1][0]
-
     def _parse_color(self, color: str) -> Tuple[int, ...]:
         """Parse color string to RGBA tuple"""
         if color.startswith("#"):
@@ -292,12 +425,61 @@ class ImageProcessor:
         return (255, 255, 255, 255)
 
     def create_background(
+        self,
+        width: int,
+        height: int,
+        background_config: dict,
+        quality: str = DEFAULT_QUALITY
+    ) -> Image.Image:
+        """Create background image based on configuration
+
+        Rendered backgrounds are cached by a hash of their config, size and
+        quality profile. The returned image always belongs to the caller,
+        who may draw on it.
+        """
+        key = self._background_cache_key(width, height, background_config) + (quality,)
+        background = self.background_cache.get(key)
+        if background is None:
+            background = self._render_background(
+                width, height, background_config, quality
+            )
+            self.background_cache.put(key, background)
+        return background
+
+    def _background_cache_key(
         self,
         width: int,
         height: int,
         background_config: dict
+    ) -> tuple:
+        """Cache key for a background: size plus a canonical config hash"""
+        config = dict(background_config)
+
+        # Hash the seed actually used so seeded and default noise never collide
+        noise_config = config.get("noise")
+        if noise_config and noise_config.get("enabled", False):
+            config["noise"] = {
+                **noise_config,
+                "seed": noise_config.get("seed", DEFAULT_NOISE_SEED)
+            }
+
+        # Image backgrounds depend on the file contents, not just the path
+        if config.get("type") == "image":
+            image_url = config.get("image_url")
+            if image_url and os.path.exists(image_url):
+                stat = os.stat(image_url)
+                config["image_stat"] = [stat.st_mtime_ns, stat.st_size]
+
+        return (width, height, config_hash(config))
+
+    def _render_background(
+        self,
+        width: int,
+        height: int,
+        background_config: dict,
+        quality: str = DEFAULT_QUALITY
     ) -> Image.Image:
-        """Create background image based on configuration"""
+        """Render a background image without caching"""
         bg_type = background_config.get("type", "solid")
 
         if bg_type == "solid":
@@ -341,7 +523,7 @@ class ImageProcessor:
 
         elif bg_type == "glassmorphism":
             background = self._create_glassmorphism_background(
-                width, height, background_config
+                width, height, background_config, quality
             )
 
         elif bg_type == "blobs":
@@ -351,17 +533,18 @@ class ImageProcessor:
             blobs = self._create_abstract_blobs(
                 width, height,
                 background_config.get("blobs", []),
-                background_config.get("blur", 150)
+                background_config.get("blur", 150),
+                quality
             )
             background = Image.alpha_composite(background, blobs)
 
         elif bg_type == "image":
             # Load and resize background image
             image_url = background_config.get("image_url")
-            if image_url and os.path.exists(image_url):
-                bg_image = Image.open(image_url).convert("RGBA")
-                background = bg_image.resize((width, height), Image.Resampling.LANCZOS)
-            else:
+            background = None
+            if image_url:
+                background = self.load_image(image_url, (width, height), quality)
+            if background is None:
                 background = Image.new("RGBA", (width, height), (255, 255, 255, 255))
 
         else:
@@ -374,46 +557,136 @@ class ImageProcessor:
             background = self._add_noise_texture(
                 background,
                 noise_config.get("intensity", 0.03),
-                noise_config.get("monochrome", True)
+                noise_config.get("monochrome", True),
+                noise_config.get("seed", DEFAULT_NOISE_SEED)
             )
 
         return background
 
-    def create_panoramic_background(
+    def create_panoramic_strip(
         self,
         width: int,
         height: int,
         background_config: dict,
-        screenshot_index: int,
-        total_screenshots: int
+        total_screenshots: int,
+        quality: str = DEFAULT_QUALITY
     ) -> Image.Image:
-        """Create a panoramic background that spans multiple screenshots.
+        """Create the full panoramic background that spans all screenshots.
 
-        This creates a wide background and crops the appropriate section
-        for each screenshot position.
+        The strip is width * total_screenshots wide. Render it once and cut
+        each screenshot's section with crop_panoramic_panel.
         """
-        # Create a wide background that spans all screenshots
         total_width = width * total_screenshots
 
-        # Create the full panoramic background
+        # Copy nested config so the caller's gradient settings are untouched
         panoramic_config = background_config.copy()
 
         # Adjust gradient angle for panoramic effect
         if panoramic_config.get("type") == "gradient":
-            gradient_config = panoramic_config.get("gradient", {})
+            gradient_config = dict(panoramic_config.get("gradient") or {})
             # For panoramic, use a horizontal gradient
             gradient_config["angle"] = gradient_config.get("panoramic_angle", 90)
             panoramic_config["gradient"] = gradient_config
 
-        # Create the full width background
-        full_background = self.create_background(total_width, height, panoramic_config)
+        return self.create_background(total_width, height, panoramic_config, quality)
 
-        # Calculate crop area for this screenshot
+    def crop_panoramic_panel(
+        self,
+        strip: Image.Image,
+        width: int,
+        screenshot_index: int
+    ) -> Image.Image:
+        """Cut the section of a panoramic strip for one screenshot position"""
         left = screenshot_index * width
-        right = left + width
+        return strip.crop((left, 0, left + width, strip.height))
+
+    def create_panoramic_background(
+        self,
+        width: int,
+        height: int,
+        background_config: dict,
+        screenshot_index: int,
+        total_screenshots: int
+    ) -> Image.Image:
+        """Create a panoramic background that spans multiple screenshots.
+
+        This creates a wide background and crops the appropriate section
+        for each screenshot position. When rendering several screenshots of
+        the same set, build the strip once with create_panoramic_strip instead.
+        """
+        strip = self.create_panoramic_strip(
+            width, height, background_config, total_screenshots
+        )
+        return self.crop_panoramic_panel(strip, width, screenshot_index)
+
+    def plan_device_geometry(
+        self,
+        device_config: dict,
+        target_width: int,
+        target_height: int
+    ) -> dict:
+        """Compute the device's final rectangle on the canvas and its parts
+
+        The framed device (including shadow margins) takes device scale of
+        the canvas width. Every frame element is laid out at that final
+        size so the screenshot is resampled exactly once.
+        """
+        spec = DEVICE_SPECS.get(device_config.get("model", "iphone-6.9"))
+        if not spec:
+            spec = DEVICE_SPECS.get("iphone-6.9")
+
+        shadow_blur = 0
+        if device_config.get("shadow", True) and device_config.get("style", "realistic") != "none":
+            shadow_blur = device_config.get("shadow_blur", 40)
+
+        # Scale is relative to canvas width (e.g., 0.75 = device takes 75% of canvas width)
+        device_scale = device_config.get("scale", 0.75)
+        geometry = self._frame_geometry(
+            spec, shadow_blur, int(target_width * device_scale)
+        )
+
+        pos_x = device_config.get("position_x", 0.5)
+        pos_y = device_config.get("position_y", 0.55)
+        geometry["x"] = int(target_width * pos_x - geometry["width"] // 2)
+        geometry["y"] = int(target_height * pos_y - geometry["height"] // 2)
+
+        return geometry
+
+    def _frame_geometry(
+        self,
+        spec: dict,
+        shadow_blur: int,
+        target_device_width: Optional[int] = None
+    ) -> dict:
+        """Lay out a device frame scaled so its shadowed width is target_device_width
 
-        # Crop and return the section for this screenshot
-        return full_background.crop((left, 0, right, height))
+        Without a target width the frame keeps its native size.
+        """
+        native_width = spec["frame_width"] + 2 * shadow_blur
+        native_height = spec["frame_height"] + 2 * shadow_blur
+        if target_device_width is None:
+            target_device_width = native_width
+
+        scale = target_device_width / native_width
+        width = target_device_width
+        height = int(native_height * scale)
+        pad = int(round(shadow_blur * scale))
+
+        return {
+            "scale": scale,
+            "width": width,
+            "height": height,
+            "frame_width": width - 2 * pad,
+            "frame_height": height - 2 * pad,
+            "shadow_blur": pad,
+            "shadow_offset": int(round(10 * scale)),
+            "screen_x": int(round(spec["screen_offset_x"] * scale)),
+            "screen_y": int(round(spec["screen_offset_y"] * scale)),
+            "screen_width": max(1, int(round(spec["screen_width"] * scale))),
+            "screen_height": max(1, int(round(spec["screen_height"] * scale))),
+            "corner_radius": int(round(spec["corner_radius"] * scale)),
+            "bezel_radius": int(round((spec["corner_radius"] + 10) * scale))
+        }
 
     def create_device_frame(
         self,
@@ -423,64 +696,300 @@ class ImageProcessor:
         style: str = "realistic",
         shadow: bool = True,
         shadow_blur: int = 40,
-        shadow_opacity: float = 0.3
+        shadow_opacity: float = 0.3,
+        geometry: Optional[dict] = None,
+        shadow_renderer: str = "raster",
+        quality: str = DEFAULT_QUALITY,
+        fit: str = "fill",
+        position: Tuple[float, float] = (0.5, 0.5)
     ) -> Image.Image:
-        """Create device frame with screenshot inside"""
+        """Create device frame with screenshot inside
+
+        Pass a geometry from plan_device_geometry to render the frame
+        directly at its final size; otherwise it is rendered at native size.
+        shadow_renderer picks how the drop shadow is drawn: "raster" (the
+        default) blurs the frame's silhouette with shadow_blur as sigma;
+        "analytic" evaluates the blurred rounded rect in closed form, with
+        shadow_blur as the CSS blur radius (two sigma), and lets the shadow
+        fill the margin around the frame, so it looks softer and wider. quality picks the screen's resampling filter
+        and the raster shadow's blur profile, and fit and position how the
+        screenshot is placed on the screen (see image_io.fit_layout).
+        """
         spec = DEVICE_SPECS.get(device_id)
         if not spec:
             spec = DEVICE_SPECS.get("iphone-6.9")
 
-        # For now, create a simple rounded rectangle frame
-        frame_width = spec["frame_width"]
-        frame_height = spec["frame_height"]
-        screen_width = spec["screen_width"]
-        screen_height = spec["screen_height"]
-        offset_x = spec["screen_offset_x"]
-        offset_y = spec["screen_offset_y"]
-        corner_radius = spec["corner_radius"]
+        has_shadow = shadow and style != "none"
+        if geometry is None:
+            geometry = self._frame_geometry(spec, shadow_blur if has_shadow else 0)
 
-        # Create frame image with transparency
-        frame = Image.new("RGBA", (frame_width, frame_height), (0, 0, 0, 0))
+        assets = self._get_frame_assets(
+            spec["id"], device_color, style, has_shadow, shadow_opacity, geometry,
+            shadow_renderer, quality
+        )
+
+        # Resize screen image to fit; this is its only resample, and it is
+        # skipped for screens already fitted by load_image
+        screen_size = (geometry["screen_width"], geometry["screen_height"])
+        screen_resized = fit_image(screen_image, screen_size, quality, fit, position)
+
+        # Respect transparency in the screenshot itself
+        screen_mask = assets["screen_mask"]
+        if screen_resized.getextrema()[3][0] < 255:
+            screen_mask = ImageChops.multiply(screen_mask, screen_resized.getchannel("A"))
+
+        # Paste screen onto the prebuilt shadow and bezel
+        frame = assets["base"].copy()
+        frame.paste(screen_resized, assets["screen_position"], screen_mask)
+
+        return frame
+
+    def _frame_asset_key(
+        self,
+        device_id: str,
+        device_color: str,
+        style: str,
+        has_shadow: bool,
+        shadow_opacity: float,
+        geometry: dict,
+        shadow_renderer: str,
+        quality: str
+    ) -> tuple:
+        """Cache key of a frame's sprites; only what changes them is included"""
+        has_bezel = style == "realistic" or style == "clay"
+        return (
+            device_id,
+            style,
+            device_color if has_bezel else None,
+            has_shadow,
+            shadow_opacity if has_shadow else None,
+            geometry["width"],
+            geometry["height"],
+            geometry["shadow_blur"] if has_shadow else None,
+            geometry["shadow_offset"] if has_shadow else None,
+            shadow_renderer if has_shadow else None,
+            quality if has_shadow and shadow_renderer == "raster" else None
+        )
 
-        # Resize screen image to fit
-        screen_resized = screen_image.resize(
-            (screen_width, screen_height),
-            Image.Resampling.LANCZOS
+    def _get_frame_assets(
+        self,
+        device_id: str,
+        device_color: str,
+        style: str,
+        has_shadow: bool,
+        shadow_opacity: float,
+        geometry: dict,
+        shadow_renderer: str = "raster",
+        quality: str = DEFAULT_QUALITY
+    ) -> dict:
+        """Get the screenshot-independent sprites of a device frame
+
+        Returns the shadowed bezel ("base"), the rounded screen mask and the
+        screen's position within the base. Built once per key and cached.
+        """
+        key = self._frame_asset_key(
+            device_id, device_color, style, has_shadow, shadow_opacity, geometry,
+            shadow_renderer, quality
         )
+        assets = self.frame_asset_cache.get(key)
+        if assets is not None:
+            return assets
+
+        has_bezel = style == "realistic" or style == "clay"
+
+        # For now, create a simple rounded rectangle frame
+        frame_width = geometry["frame_width"]
+        frame_height = geometry["frame_height"]
+        screen_width = geometry["screen_width"]
+        screen_height = geometry["screen_height"]
+        offset_x = geometry["screen_x"]
+        offset_y = geometry["screen_y"]
 
         # Create rounded rectangle mask for screen
         screen_mask = Image.new("L", (screen_width, screen_height), 0)
         mask_draw = ImageDraw.Draw(screen_mask)
         mask_draw.rounded_rectangle(
             [0, 0, screen_width - 1, screen_height - 1],
-            radius=corner_radius,
+            radius=geometry["corner_radius"],
             fill=255
         )
 
-        # Apply mask to screen
-        screen_with_mask = Image.new("RGBA", (screen_width, screen_height), (0, 0, 0, 0))
-        screen_with_mask.paste(screen_resized, (0, 0), screen_mask)
+        # Create frame image with transparency
+        frame = Image.new("RGBA", (frame_width, frame_height), (0, 0, 0, 0))
 
         # Create device bezel (simple dark frame)
-        if style == "realistic" or style == "clay":
+        if has_bezel:
             bezel_color = self._get_device_bezel_color(device_color, style)
-            bezel = Image.new("RGBA", (frame_width, frame_height), (0, 0, 0, 0))
-            bezel_draw = ImageDraw.Draw(bezel)
+            bezel_draw = ImageDraw.Draw(frame)
             bezel_draw.rounded_rectangle(
                 [0, 0, frame_width - 1, frame_height - 1],
-                radius=corner_radius + 10,
+                radius=geometry["bezel_radius"],
                 fill=bezel_color
             )
-            frame = Image.alpha_composite(frame, bezel)
 
-        # Paste screen onto frame
-        frame.paste(screen_with_mask, (offset_x, offset_y), screen_with_mask)
+        # Add shadow if enabled; it follows the bezel plus the screen area
+        screen_x, screen_y = offset_x, offset_y
+        if has_shadow:
+            if shadow_renderer == "analytic":
+                # Shadow of the device silhouette, computed in closed form
+                if has_bezel:
+                    silhouette = (0, 0, frame_width, frame_height)
+                    silhouette_radius = geometry["bezel_radius"]
+                else:
+                    silhouette = (
+                        offset_x, offset_y,
+                        offset_x + screen_width, offset_y + screen_height
+                    )
+                    silhouette_radius = geometry["corner_radius"]
+                frame = self._add_analytic_shadow(
+                    frame, silhouette, silhouette_radius, geometry["shadow_blur"],
+                    shadow_opacity, geometry["shadow_offset"]
+                )
+            else:
+                # Blur the silhouette rather than the base's own alpha, so
+                # the screen area stays clear for translucent screenshots
+                silhouette = frame.getchannel("A")
+                silhouette.paste(255, (offset_x, offset_y), screen_mask)
+                frame = self._add_shadow(
+                    frame, geometry["shadow_blur"], shadow_opacity,
+                    geometry["shadow_offset"], quality, silhouette
+                )
+            screen_x += geometry["shadow_blur"]
+            screen_y += geometry["shadow_blur"]
+
+        assets = {
+            "base": frame,
+            "screen_mask": screen_mask,
+            "screen_position": (screen_x, screen_y)
+        }
+        self.frame_asset_cache.put(key, assets)
+        return assets
+
+    def warm_frame_assets(
+        self,
+        device_config: Optional[dict] = None,
+        device_ids: Optional[List[str]] = None
+    ) -> int:
+        """Prebuild frame sprites for each device and each of its colors
+
+        Each device is laid out on its own App Store canvas using
+        device_config (defaults match DeviceConfig). Devices without listed
+        colors are warmed with the default bezel color. Sprites are sized
+        from their geometry first, and only those that fit in what is left
+        of the frame cache are built, so warm-up never evicts its own work;
+        a warning names how many were skipped. Returns how many were built.
+        """
+        device_config = device_config or {
+            "style": "realistic",
+            "scale": 0.85,
+            "shadow": True,
+            "shadow_blur": 40,
+            "shadow_opacity": 0.3,
+            "shadow_renderer": "raster"
+        }
+        style = device_config.get("style", "realistic")
+        has_shadow = device_config.get("shadow", True) and style != "none"
+        has_bezel = style == "realistic" or style == "clay"
+
+        shadow_opacity = device_config.get("shadow_opacity", 0.3)
+        shadow_renderer = device_config.get("shadow_renderer", "raster")
+        cached = set(self.frame_asset_cache.keys())
+        stats = self.frame_asset_cache.stats()
+        available = stats["max_bytes"] - stats["bytes"]
+        evictions = stats["evictions"]
+        built = 0
+        skipped_bytes = []
+        for device_id in device_ids or DEVICE_SPECS.keys():
+            spec = DEVICE_SPECS[device_id]
+            geometry = self.plan_device_geometry(
+                {**device_config, "model": device_id}, spec["width"], spec["height"]
+            )
+            # What the cache will count for the base and the screen mask
+            margin = 2 * geometry["shadow_blur"] if has_shadow else 0
+            sprite_bytes = (
+                (geometry["frame_width"] + margin) * (geometry["frame_height"] + margin) * 4
+                + geometry["screen_width"] * geometry["screen_height"]
+            )
+
+            colors = DEVICE_COLORS.get(spec["category"]) or [{"id": "natural-titanium"}]
+            if not has_bezel:
+                # Without a bezel every color shares one sprite
+                colors = colors[:1]
+            for color in colors:
+                key = self._frame_asset_key(
+                    device_id, color["id"], style, has_shadow, shadow_opacity,
+                    geometry, shadow_renderer, DEFAULT_QUALITY
+                )
+                if key in cached:
+                    continue
+                if sprite_bytes > available:
+                    skipped_bytes.append(sprite_bytes)
+                    continue
+                self._get_frame_assets(
+                    device_id, color["id"], style, has_shadow, shadow_opacity,
+                    geometry, shadow_renderer
+                )
+                available -= sprite_bytes
+                built += 1
+
+        if skipped_bytes:
+            logger.warning(
+                "Frame sprite warm-up skipped %d sprites; FRAME_ASSET_CACHE_MB "
+                "needs %d more MB to hold them all",
+                len(skipped_bytes), math.ceil(sum(skipped_bytes) / 1024 / 1024)
+            )
+        if self.frame_asset_cache.stats()["evictions"] > evictions:
+            logger.warning("Frame sprite warm-up evicted cached sprites")
+        return built
+
+    def evict_frame_assets(self, device_id: Optional[str] = None):
+        """Drop cached frame sprites for one device, or all of them"""
+        if device_id is None:
+            self.frame_asset_cache.clear()
+            return
+        for key in self.frame_asset_cache.keys():
+            if key[0] == device_id:
+                self.frame_asset_cache.discard(key)
+
+    def load_image(
+        self,
+        path: str,
+        size: Optional[Tuple[int, int]] = None,
+        quality: str = DEFAULT_QUALITY,
+        fit: str = "fill",
+        position: Tuple[float, float] = (0.5, 0.5)
+    ) -> Optional[Image.Image]:
+        """Decode an image file to RGBA, fitted to size if given
+
+        fit and position place the image in size as in fit_image. Decoded
+        files and each fitted size are cached by path, modification time
+        and file size, so an asset is decoded once and resampled once per
+        size. Files loaded at a size are decoded already reduced toward it
+        (see image_io.py) and only the fitted image is kept. Returns None if
+        the file does not exist.
+        """
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+
+        key = (
+            os.path.abspath(path),
+            stat.st_mtime_ns,
+            stat.st_size,
+            size,
+            (quality, fit, tuple(position)) if size else None
+        )
+        image = self.image_asset_cache.get(key)
+        if image is not None:
+            return image
 
-        # Add shadow if enabled
-        if shadow and style != "none":
-            frame = self._add_shadow(frame, shadow_blur, shadow_opacity)
+        image = decode_image(path, size, fit)
+        if size is not None:
+            image = fit_image(image, size, quality, fit, position)
 
-        return frame
+        self.image_asset_cache.put(key, image)
+        return image
 
     def _get_device_bezel_color(
         self, device_color: str, style: str
@@ -509,22 +1018,21 @@ class ImageProcessor:
         self,
         image: Image.Image,
         blur_radius: int = 40,
-        opacity: float = 0.3
+        opacity: float = 0.3,
+        offset_y: int = 10,
+        quality: str = DEFAULT_QUALITY,
+        silhouette: Optional[Image.Image] = None
     ) -> Image.Image:
-        """Add drop shadow to image"""
-        # Create shadow layer
-        shadow = Image.new("RGBA", image.size, (0, 0, 0, 0))
+        """Add drop shadow to image
 
+        The shadow follows image's alpha, or the silhouette mask if given.
+        """
         # Get alpha channel and offset
-        alpha = image.split()[-1]
+        alpha = silhouette if silhouette is not None else image.getchannel("A")
         shadow_alpha = alpha.point(lambda x: int(x * opacity))
 
-        # Create shadow image
-        shadow_img = Image.new("RGBA", image.size, (0, 0, 0, 255))
-        shadow_img.putalpha(shadow_alpha)
-
-        # Blur shadow
-        shadow_img = shadow_img.filter(ImageFilter.GaussianBlur(blur_radius))
+        # The shadow color is constant, so only its alpha needs blurring
+        shadow_img = blur.blur_alpha(shadow_alpha, blur_radius, (0, 0, 0), quality)
 
         # Create output with shadow behind
         output = Image.new(
@@ -534,7 +1042,41 @@ class ImageProcessor:
         )
 
         # Paste shadow with offset
-        output.paste(shadow_img, (blur_radius, blur_radius + 10))
+        output.paste(shadow_img, (blur_radius, blur_radius + offset_y))
+
+        # Paste original image on top
+        output.paste(image, (blur_radius, blur_radius), image)
+
+        return output
+
+    def _add_analytic_shadow(
+        self,
+        image: Image.Image,
+        box: Tuple[int, int, int, int],
+        radius: int,
+        blur_radius: int = 40,
+        opacity: float = 0.3,
+        offset_y: int = 10
+    ) -> Image.Image:
+        """Add the drop shadow of a rounded rect within image, computed in closed form
+
+        Produces the same layout as _add_shadow. blur_radius is treated as
+        two standard deviations, as in CSS and canvas shadows, so the
+        shadow fades out within the margin around the image.
+        """
+        size = (image.width + blur_radius * 2, image.height + blur_radius * 2)
+        left, top, right, bottom = box
+        shadow_box = (
+            left + blur_radius,
+            top + blur_radius + offset_y,
+            right + blur_radius,
+            bottom + blur_radius + offset_y
+        )
+
+        output = Image.new("RGBA", size, (0, 0, 0, 0))
+        output.putalpha(
+            rounded_rect_shadow(size, shadow_box, radius, blur_radius / 2.0, opacity)
+        )
 
         # Paste original image on top
         output.paste(image, (blur_radius, blur_radius), image)
@@ -547,28 +1089,11 @@ class ImageProcessor:
         font_size: int,
         font_weight: int = 400
     ) -> ImageFont.FreeTypeFont:
-        """Get font with caching"""
-        cache_key = f"{font_family}_{font_size}_{font_weight}"
-        if cache_key in self._font_cache:
-            return self._font_cache[cache_key]
-
-        # Try to load font from assets
-        font_path = os.path.join(self.fonts_path, f"{font_family}.ttf")
-
-        try:
-            if os.path.exists(font_path):
-                font = ImageFont.truetype(font_path, font_size)
-            else:
-                # Fall back to default font
-                font = ImageFont.truetype(
-                    "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf",
-                    font_size
-                )
-        except Exception:
-            font = ImageFont.load_default()
+        """Get the nearest face to font_weight in font_family
 
-        self._font_cache[cache_key] = font
-        return font
+        Families that aren't installed fall back to the default family.
+        """
+        return self.fonts.font(font_family, font_size, font_weight)
 
     def draw_text(
         self,
@@ -576,12 +1101,14 @@ class ImageProcessor:
         text: str,
         position: Tuple[int, int],
         style: dict,
-        max_width: Optional[int] = None
+        max_width: Optional[int] = None,
+        locale: Optional[str] = None
     ) -> Image.Image:
-        """Draw text on image with styling"""
+        """Draw text on image with styling, wrapped by the rules of locale"""
         draw = ImageDraw.Draw(image)
 
-        font = self.get_font(
+        # Characters the family has no glyph for come from fallback fonts
+        font = self.fonts.font_chain(
             style.get("font_family", "SF Pro Display"),
             style.get("font_size", 48),
             style.get("font_weight", 700)
@@ -589,76 +1116,40 @@ class ImageProcessor:
 
         color = self._parse_color(style.get("color", "#000000"))
         alignment = style.get("alignment", "center")
+        letter_spacing = style.get("letter_spacing", 0)
+
+        # Wrap and place the lines; without max_width the text is one line
+        lines = layout_text(
+            text,
+            font,
+            position,
+            max_width,
+            alignment,
+            style.get("font_size", 48) * style.get("line_height", 1.2),
+            locale,
+            letter_spacing
+        )
 
         # Handle text background
         bg_config = style.get("background")
         if bg_config and bg_config.get("enabled"):
-            self._draw_text_background(draw, text, position, font, bg_config, max_width)
-
-        # Draw text
-        if max_width:
-            # Word wrap
-            lines = self._wrap_text(text, font, max_width)
-            y = position[1]
-            line_height = style.get("font_size", 48) * style.get("line_height", 1.2)
-
-            for line in lines:
-                bbox = font.getbbox(line)
-                text_width = bbox[2] - bbox[0]
-
-                if alignment == "center":
-                    x = position[0] - text_width // 2
-                elif alignment == "right":
-                    x = position[0] - text_width
-                else:
-                    x = position[0]
+            self._draw_text_background(draw, lines, bg_config)
 
-                draw.text((x, y), line, font=font, fill=color[:3])
-                y += int(line_height)
-        else:
-            draw.text(position, text, font=font, fill=color[:3])
+        # Draw text from cached glyph masks
+        for line in lines:
+            draw_line(
+                image, line["box"][:2], line["text"], font, color[:3], letter_spacing
+            )
 
         return image
 
-    def _wrap_text(
-        self, text: str, font: ImageFont.FreeTypeFont, max_width: int
-    ) -> List[str]:
-        """Wrap text to fit within max width"""
-        words = text.split()
-        lines = []
-        current_line = []
-
-        for word in words:
-            test_line = " ".join(current_line + [word])
-            bbox = font.getbbox(test_line)
-            width = bbox[2] - bbox[0]
-
-            if width <= max_width:
-                current_line.append(word)
-            else:
-                if current_line:
-                    lines.append(" ".join(current_line))
-                current_line = [word]
-
-        if current_line:
-            lines.append(" ".join(current_line))
-
-        return lines
-
     def _draw_text_background(
         self,
         draw: ImageDraw.Draw,
-        text: str,
-        position: Tuple[int, int],
-        font: ImageFont.FreeTypeFont,
-        bg_config: dict,
-        max_width: Optional[int]
+        lines: List[dict],
+        bg_config: dict
     ):
-        """Draw background behind text"""
-        bbox = font.getbbox(text)
-        text_width = bbox[2] - bbox[0]
-        text_height = bbox[3] - bbox[1]
-
+        """Draw a background behind each laid-out line of text"""
         padding = bg_config.get("padding", 8)
         radius = bg_config.get("border_radius", 4)
         opacity = bg_config.get("opacity", 0.8)
@@ -667,12 +1158,13 @@ class ImageProcessor:
         # Adjust color with opacity
         color = color[:3] + (int(255 * opacity),)
 
-        x1 = position[0] - padding
-        y1 = position[1] - padding
-        x2 = position[0] + text_width + padding
-        y2 = position[1] + text_height + padding
-
-        draw.rounded_rectangle([x1, y1, x2, y2], radius=radius, fill=color)
+        for line in lines:
+            x1, y1, x2, y2 = line["box"]
+            draw.rounded_rectangle(
+                [x1 - padding, y1 - padding, x2 + padding, y2 + padding],
+                radius=radius,
+                fill=color
+            )
 
     def compose_screenshot(
         self,
@@ -681,36 +1173,63 @@ class ImageProcessor:
         texts: List[dict],
         device_config: dict,
         target_width: int,
-        target_height: int
+        target_height: int,
+        quality: str = DEFAULT_QUALITY
     ) -> Image.Image:
         """Compose final screenshot with all elements"""
+        output = self.compose_device(
+            background, device_frame, device_config, target_width, target_height,
+            quality
+        )
+        return self.draw_texts(output, texts, target_width, target_height)
+
+    def compose_device(
+        self,
+        background: Image.Image,
+        device_frame: Image.Image,
+        device_config: dict,
+        target_width: int,
+        target_height: int,
+        quality: str = DEFAULT_QUALITY
+    ) -> Image.Image:
+        """Place the device frame on a copy of the background"""
         # Create output at target size
         output = background.copy()
 
-        # Calculate device position
-        # Scale is relative to canvas width (e.g., 0.75 = device takes 75% of canvas width)
-        device_scale = device_config.get("scale", 0.75)
-        pos_x = device_config.get("position_x", 0.5)
-        pos_y = device_config.get("position_y", 0.55)
+        geometry = self.plan_device_geometry(device_config, target_width, target_height)
 
-        # Scale device frame relative to canvas width
-        target_device_width = int(target_width * device_scale)
-        scale_factor = target_device_width / device_frame.width
-        new_width = target_device_width
-        new_height = int(device_frame.height * scale_factor)
-        device_scaled = device_frame.resize(
-            (new_width, new_height),
-            Image.Resampling.LANCZOS
-        )
+        if device_frame.width == geometry["width"]:
+            # Frame was rendered at its final size already
+            x, y = geometry["x"], geometry["y"]
+            device_scaled = device_frame
+        else:
+            # Scale a native-size device frame relative to canvas width
+            pos_x = device_config.get("position_x", 0.5)
+            pos_y = device_config.get("position_y", 0.55)
+            new_width = geometry["width"]
+            scale_factor = new_width / device_frame.width
+            new_height = int(device_frame.height * scale_factor)
+            device_scaled = resample_image(
+                device_frame, (new_width, new_height), quality
+            )
 
-        # Calculate position
-        x = int(target_width * pos_x - new_width // 2)
-        y = int(target_height * pos_y - new_height // 2)
+            # Calculate position
+            x = int(target_width * pos_x - new_width // 2)
+            y = int(target_height * pos_y - new_height // 2)
 
         # Paste device onto background
         output.paste(device_scaled, (x, y), device_scaled)
 
-        # Draw texts
+        return output
+
+    def draw_texts(
+        self,
+        image: Image.Image,
+        texts: List[dict],
+        target_width: int,
+        target_height: int
+    ) -> Image.Image:
+        """Draw text entries onto an image in place"""
         for text_config in texts:
             text = text_config.get("text", "")
             if not text:
@@ -719,19 +1238,28 @@ class ImageProcessor:
             style = text_config.get("style", {})
             text_y = text_config.get("position_y", 0.1)
 
-            # Calculate text position
-            text_x = target_width // 2
+            # Calculate text position: lines wrap within a centered column,
+            # aligned to its center or to one of its edges
+            max_width = int(target_width * 0.85)
+            alignment = style.get("alignment", "center")
+            if alignment == "left":
+                text_x = (target_width - max_width) // 2
+            elif alignment == "right":
+                text_x = (target_width + max_width) // 2
+            else:
+                text_x = target_width // 2
             text_y_px = int(target_height * text_y)
 
-            output = self.draw_text(
-                output,
+            image = self.draw_text(
+                image,
                 text,
                 (text_x, text_y_px),
                 style,
-                max_width=int(target_width * 0.85)
+                max_width=max_width,
+                locale=text_config.get("locale")
             )
 
-        return output
+        return image
 
     def export_to_size(
         self,
@@ -743,7 +1271,7 @@ class ImageProcessor:
     ) -> bytes:
         """Export image to specific size and format"""
         # Resize to target dimensions
-        resized = image.resize((width, height), Image.Resampling.LANCZOS)
+        resized = resample_image(image, (width, height))
 
         # Convert to RGB for JPEG
         if format.lower() == "jpeg":
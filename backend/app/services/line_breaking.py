@@ -0,0 +1,212 @@
+"""Line break opportunities for wrapping headlines
+
+Text is split into segments that must stay on one line, each followed by
+the whitespace after it. Breaks follow the Unicode line breaking
+algorithm (UAX #14): Latin-script text breaks after spaces and hyphens,
+Chinese and Japanese between ideographs and kana, but never before
+closing punctuation or small kana, or after opening brackets. Korean
+keeps words whole and breaks at spaces.
+
+Thai, Lao, Khmer and Burmese are written without spaces between words.
+With PyICU installed, the whole string goes through ICU's line breaker,
+which segments those scripts with its dictionaries and tailors the rules
+to the locale. Without it, a built-in subset of UAX #14 is used, and Thai
+breaks between the words found by PyThaiNLP's dictionary segmenter. A run
+of those scripts that no segmenter can split is kept whole: not wrapping
+a word is better than breaking it in the middle.
+
+Segments are cached per (text, locale).
+"""
+import threading
+import unicodedata
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+try:
+    import icu
+except ImportError:
+    icu = None
+
+# Segmented texts kept per process
+MAX_CACHED_TEXTS = 4096
+
+# Never start a line: closing punctuation, small kana, iteration marks,
+# the prolonged sound mark and other UAX #14 CL, CP, EX, IS and NS
+# characters
+NO_BREAK_BEFORE = frozenset(
+    "!%),.:;?]}¢°’”‼⁇⁈⁉、。〉》」』】〕〗〙〛〞々〻"
+    "ぁぃぅぇぉっゃゅょゎゕゖ゛゜ゝゞ"
+    "ァィゥェォッャュョヮヵヶーヽヾ・"
+    "！％），．：；？］｝｡｣､･ｧｨｩｪｫｬｭｮｯｰ"
+    "ฯๆ"
+)
+
+# Never end a line: opening punctuation and currency prefixes (OP, PR)
+NO_BREAK_AFTER = frozenset("([{£¥$‘“〈《「『【〔〖〘〚〝（［｛｢＄")
+
+# No break on either side: no-break spaces, word joiner, non-breaking
+# hyphen, zero width joiner (GL, WJ, ZWJ)
+GLUE = frozenset("\u00a0\u202f\u2007\u2011\u2060\ufeff\u200d")
+
+# Break after these when a letter follows (BA, HY)
+BREAK_AFTER = frozenset("-\u2010\u2012\u2013")
+
+ZERO_WIDTH_SPACE = "\u200b"
+
+# Characters with a break opportunity on both sides (UAX #14 ID)
+IDEOGRAPHIC_RANGES = (
+    (0x2E80, 0x2FFF),  # CJK radicals, Kangxi radicals
+    (0x3000, 0x303F),  # CJK symbols and punctuation
+    (0x3040, 0x30FF),  # Hiragana, Katakana
+    (0x3100, 0x312F),  # Bopomofo
+    (0x3190, 0x31FF),  # Kanbun, Katakana extensions
+    (0x3400, 0x4DBF),  # CJK extension A
+    (0x4E00, 0x9FFF),  # CJK unified ideographs
+    (0xF900, 0xFAFF),  # CJK compatibility ideographs
+    (0xFF01, 0xFF60),  # Fullwidth forms
+    (0x1F300, 0x1FAFF),  # Emoji
+    (0x20000, 0x3FFFF),  # CJK extensions B and later
+)
+
+# Thai, written without spaces between words (UAX #14 SA) like Lao,
+# Khmer and Burmese, whose runs are not split without ICU
+THAI_RANGES = ((0x0E00, 0x0E7F),)
+
+_segments = OrderedDict()
+_lock = threading.Lock()
+_thai_segment = None
+
+
+def _in_ranges(char: str, ranges: tuple) -> bool:
+    code = ord(char)
+    for start, end in ranges:
+        if start <= code <= end:
+            return True
+    return False
+
+
+def _is_space(char: str) -> bool:
+    return char.isspace() and char not in GLUE
+
+
+def _attaches(char: str) -> bool:
+    """Combining marks, variation selectors and emoji modifiers (UAX #14 CM)"""
+    return (
+        unicodedata.category(char) in ("Mn", "Mc", "Me")
+        or 0x1F3FB <= ord(char) <= 0x1F3FF
+    )
+
+
+def _can_break(before: str, after: str) -> bool:
+    """Whether a line may break between two adjacent characters"""
+    if _is_space(after):
+        return False
+    if before == ZERO_WIDTH_SPACE:
+        return True
+    if after in NO_BREAK_BEFORE or _attaches(after):
+        return False
+    if _is_space(before):
+        return True
+    if before in GLUE or after in GLUE:
+        return False
+    if before in NO_BREAK_AFTER:
+        return False
+    if before in BREAK_AFTER:
+        return after.isalpha()
+    if _in_ranges(before, IDEOGRAPHIC_RANGES) or _in_ranges(after, IDEOGRAPHIC_RANGES):
+        return True
+    # Between letters, including inside runs of Thai, Lao, Khmer and
+    # Burmese; word breaks in Thai come from _thai_breaks
+    return False
+
+
+def _thai_segmenter():
+    """PyThaiNLP's dictionary word segmenter, or None if not installed
+
+    Imported on first use, as importing pythainlp takes seconds.
+    """
+    global _thai_segment
+    if _thai_segment is None:
+        try:
+            from pythainlp.tokenize.newmm import segment
+        except ImportError:
+            segment = False
+        _thai_segment = segment
+    return _thai_segment or None
+
+
+def _thai_breaks(text: str) -> list:
+    """Word boundaries inside runs of Thai letters"""
+    segment = _thai_segmenter()
+    if segment is None:
+        return []
+
+    breaks = []
+    start = None
+    for index, char in enumerate(text + " "):
+        is_thai = _in_ranges(char, THAI_RANGES)
+        if is_thai and start is None:
+            start = index
+        elif not is_thai and start is not None:
+            offset = start
+            for word in segment(text[start:index])[:-1]:
+                offset += len(word)
+                if text[offset] not in NO_BREAK_BEFORE and not _attaches(text[offset]):
+                    breaks.append(offset)
+            start = None
+    return breaks
+
+
+def _rule_breaks(text: str) -> list:
+    breaks = [
+        index for index in range(1, len(text))
+        if _can_break(text[index - 1], text[index])
+    ]
+    if any(_in_ranges(char, THAI_RANGES) for char in text):
+        breaks = sorted(set(breaks).union(_thai_breaks(text)))
+    return breaks
+
+
+def _icu_breaks(text: str, locale: Optional[str]) -> list:
+    iterator = icu.BreakIterator.createLineInstance(icu.Locale(locale or "en"))
+    iterator.setText(text)
+
+    # ICU reports offsets in UTF-16 code units
+    units = []
+    for index, char in enumerate(text):
+        units.extend([index] * (2 if ord(char) > 0xFFFF else 1))
+    units.append(len(text))
+    return [units[offset] for offset in iterator if 0 < offset < len(units) - 1]
+
+
+def line_segments(
+    text: str, locale: Optional[str] = None
+) -> Tuple[Tuple[str, str], ...]:
+    """Split text at its break opportunities
+
+    Returns (segment, whitespace) pairs, where whitespace is the run of
+    spaces after the segment. Joined back together they give the text.
+    """
+    cache_key = (text, locale)
+    with _lock:
+        segments = _segments.get(cache_key)
+        if segments is not None:
+            _segments.move_to_end(cache_key)
+            return segments
+
+    breaks = _icu_breaks(text, locale) if icu is not None else _rule_breaks(text)
+
+    segments = []
+    start = 0
+    for end in breaks + [len(text)]:
+        piece = text[start:end]
+        body = piece.rstrip()
+        segments.append((body, piece[len(body):]))
+        start = end
+    segments = tuple(segments)
+
+    with _lock:
+        _segments[cache_key] = segments
+        if len(_segments) > MAX_CACHED_TEXTS:
+            _segments.popitem(last=False)
+    return segments
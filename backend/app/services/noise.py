@@ -0,0 +1,104 @@
+"""Film grain from a bank of precomputed noise tiles
+
+Grain is independent Gaussian noise per pixel, so tiles of it join
+without seams. Each (intensity, monochrome, seed) gets a small bank of
+tiles, built once per process, and the canvas is covered by tiles picked
+from the bank with the same seed. The same config therefore always
+produces the same pixels, and applying grain never allocates a
+canvas-sized float array.
+"""
+import threading
+from typing import List, Tuple
+
+import numpy as np
+from PIL import Image
+
+# Edge length of each noise tile, in pixels
+TILE_SIZE = 256
+
+# Tiles per bank; the canvas picks among them so the grain doesn't repeat
+# on a regular grid
+TILES_PER_BANK = 8
+
+# Banks kept per process (each is about 6 MB)
+MAX_BANKS = 8
+
+_banks = {}
+_banks_lock = threading.Lock()
+
+
+def _build_bank(
+    intensity: float, monochrome: bool, seed: int
+) -> List[Tuple[np.ndarray, np.ndarray, np.ndarray]]:
+    """RGBA noise tiles split into raise and lower amounts for saturating adds
+
+    Alpha is left untouched, and monochrome grain is the same in all three
+    color channels.
+    """
+    rng = np.random.default_rng(seed)
+    channels = 1 if monochrome else 3
+
+    bank = []
+    for _ in range(TILES_PER_BANK):
+        noise = np.zeros((TILE_SIZE, TILE_SIZE, 4), dtype=np.float64)
+        noise[:, :, :3] = rng.standard_normal((TILE_SIZE, TILE_SIZE, channels)) * (255 * intensity)
+        noise = np.clip(np.rint(noise), -255, 255)
+        raise_by = np.maximum(noise, 0).astype(np.uint8)
+        bank.append((
+            raise_by,
+            255 - raise_by,
+            np.maximum(-noise, 0).astype(np.uint8)
+        ))
+    return bank
+
+
+def get_bank(
+    intensity: float, monochrome: bool, seed: int
+) -> List[Tuple[np.ndarray, np.ndarray, np.ndarray]]:
+    """Tiles for a grain config, built on first use"""
+    key = (float(intensity), bool(monochrome), int(seed))
+    with _banks_lock:
+        bank = _banks.get(key)
+    if bank is not None:
+        return bank
+
+    bank = _build_bank(*key)
+    with _banks_lock:
+        if len(_banks) >= MAX_BANKS:
+            _banks.pop(next(iter(_banks)))
+        _banks[key] = bank
+    return bank
+
+
+def add_grain(
+    image: Image.Image, intensity: float, monochrome: bool = True, seed: int = 0
+) -> Image.Image:
+    """Return image with grain added to its color channels"""
+    bank = get_bank(intensity, monochrome, seed)
+    pixels = np.array(image.convert("RGBA"))
+    height, width = pixels.shape[:2]
+
+    # Which bank tile covers each cell of the canvas
+    rows = -(-height // TILE_SIZE)
+    columns = -(-width // TILE_SIZE)
+    picks = np.random.default_rng(seed).integers(len(bank), size=(rows, columns))
+
+    for row in range(rows):
+        for column in range(columns):
+            raise_by, ceiling, lower_by = bank[picks[row, column]]
+            top = row * TILE_SIZE
+            left = column * TILE_SIZE
+            cell = pixels[top:top + TILE_SIZE, left:left + TILE_SIZE]
+            cell_height, cell_width = cell.shape[:2]
+            raise_by = raise_by[:cell_height, :cell_width]
+            ceiling = ceiling[:cell_height, :cell_width]
+            lower_by = lower_by[:cell_height, :cell_width]
+
+            # Saturating uint8 add, in place: cap before raising, floor
+            # before lowering
+            np.minimum(cell, ceiling, out=cell)
+            cell += raise_by
+            np.maximum(cell, lower_by, out=cell)
+            cell -= lower_by
+
+    return Image.fromarray(pixels, mode="RGBA")
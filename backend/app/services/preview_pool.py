@@ -0,0 +1,222 @@
+"""Preview rendering pool
+
+Previews are CPU-bound, so they run on a dedicated process pool instead of
+the event loop. A bounded admission queue keeps a burst of previews from
+piling up: once every worker is busy and the queue is full, new requests
+are rejected with PreviewQueueFull so the API can answer 503 right away.
+"""
+import asyncio
+import multiprocessing
+import os
+import sys
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Optional, Tuple
+
+from .font_registry import FontRegistry, install_font_registry
+from .generator import ScreenshotGenerator
+
+# Generator methods a preview job may call
+PREVIEW_METHODS = {"generate_preview", "generate_panoramic_preview"}
+
+# ProcessPoolExecutor replaces workers itself from Python 3.11; before
+# that the whole pool is replaced once it has run max_renders_per_worker
+# jobs per worker
+HAS_MAX_TASKS_PER_CHILD = sys.version_info >= (3, 11)
+
+
+class PreviewQueueFull(Exception):
+    """Raised when the preview admission queue has no free slots"""
+
+    def __init__(self, retry_after: int):
+        super().__init__("Preview queue is full")
+        self.retry_after = retry_after
+
+
+class PreviewPool:
+    """Runs preview renders on worker processes with bounded admission"""
+
+    def __init__(
+        self,
+        upload_dir: str,
+        output_dir: str,
+        workers: Optional[int] = None,
+        queue_size: Optional[int] = None,
+        max_renders_per_worker: Optional[int] = None,
+        memory_watermark_mb: Optional[int] = None,
+        retry_after: Optional[int] = None,
+        fonts: Optional[FontRegistry] = None
+    ):
+        self.upload_dir = upload_dir
+        self.output_dir = output_dir
+        # Passed to workers so they don't scan the font directories again
+        self.fonts = fonts
+        self.workers = _setting(workers, "PREVIEW_WORKERS", 2)
+        self.queue_size = _setting(queue_size, "PREVIEW_QUEUE_SIZE", 8)
+        self.max_renders_per_worker = _setting(
+            max_renders_per_worker, "PREVIEW_MAX_RENDERS_PER_WORKER", 200
+        )
+        self.memory_watermark = _setting(
+            memory_watermark_mb, "PREVIEW_MEMORY_WATERMARK_MB", 1024
+        ) * 1024 * 1024
+        self.retry_after = _setting(retry_after, "PREVIEW_RETRY_AFTER", 1)
+
+        self._lock = threading.Lock()
+        self._admitted = 0
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._executor_renders = 0
+        # Used when workers is 0 to render one at a time in a thread of
+        # this process
+        self._inline_executor: Optional[ThreadPoolExecutor] = None
+        self._inline_generator: Optional[ScreenshotGenerator] = None
+
+    @property
+    def capacity(self) -> int:
+        """Renders that may be running or waiting at once"""
+        return max(self.workers, 1) + self.queue_size
+
+    async def render(self, method: str, **kwargs) -> bytes:
+        """Render a preview with a ScreenshotGenerator method off the event loop
+
+        Raises PreviewQueueFull without waiting when no slot is free.
+        """
+        if method not in PREVIEW_METHODS:
+            raise ValueError(f"Unknown preview method: {method}")
+
+        with self._lock:
+            if self._admitted >= self.capacity:
+                raise PreviewQueueFull(self.retry_after)
+            self._admitted += 1
+
+        try:
+            if self.workers <= 0:
+                future = self._get_inline_executor().submit(
+                    self._render_inline, method, kwargs
+                )
+                return await asyncio.wrap_future(future)
+
+            executor = self._get_executor()
+            future = executor.submit(_render_preview, method, kwargs)
+            try:
+                image_bytes, rss = await asyncio.wrap_future(future)
+            except BrokenProcessPool:
+                # A worker died (e.g. killed for memory); start a fresh pool
+                self._recycle(executor)
+                raise
+
+            if rss > self.memory_watermark or self._renders_exhausted(executor):
+                self._recycle(executor)
+            return image_bytes
+        finally:
+            with self._lock:
+                self._admitted -= 1
+
+    def _get_inline_executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._inline_executor is None:
+                self._inline_generator = ScreenshotGenerator(
+                    upload_dir=self.upload_dir, output_dir=self.output_dir,
+                    export_workers=0
+                )
+                self._inline_executor = ThreadPoolExecutor(
+                    max_workers=1, thread_name_prefix="preview"
+                )
+            return self._inline_executor
+
+    def _render_inline(self, method: str, kwargs: dict) -> bytes:
+        return getattr(self._inline_generator, method)(**kwargs)
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                options = {}
+                if HAS_MAX_TASKS_PER_CHILD:
+                    # Workers are also replaced after max_renders_per_worker jobs
+                    options["max_tasks_per_child"] = self.max_renders_per_worker or None
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_init_preview_worker,
+                    initargs=(self.upload_dir, self.output_dir, self.fonts),
+                    **options
+                )
+                self._executor_renders = 0
+            return self._executor
+
+    def _renders_exhausted(self, executor: ProcessPoolExecutor) -> bool:
+        """Count a finished render; True once a pre-3.11 pool is due for replacement"""
+        if HAS_MAX_TASKS_PER_CHILD or not self.max_renders_per_worker:
+            return False
+        with self._lock:
+            if self._executor is not executor:
+                return False
+            self._executor_renders += 1
+            return self._executor_renders >= self.max_renders_per_worker * self.workers
+
+    def _recycle(self, executor: ProcessPoolExecutor):
+        """Replace the pool; renders already running on it still finish"""
+        with self._lock:
+            if self._executor is not executor:
+                return
+            self._executor = None
+        executor.shutdown(wait=False)
+
+    def close(self):
+        """Shut down the preview workers"""
+        with self._lock:
+            executor, self._executor = self._executor, None
+            inline_executor, self._inline_executor = self._inline_executor, None
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+        if inline_executor is not None:
+            inline_executor.shutdown(cancel_futures=True)
+
+
+def _setting(value: Optional[int], env_name: str, default: int) -> int:
+    """Resolve an explicit setting, then the environment, then the default"""
+    if value is None:
+        value = int(os.environ.get(env_name, default))
+    return max(0, value)
+
+
+def _current_rss_bytes() -> int:
+    """Resident memory of this process"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError, AttributeError):
+        pass
+
+    try:
+        import resource
+    except ImportError:
+        return 0
+    # Peak rather than current RSS, reported in KB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+# Per-process generator for preview pool workers
+_worker_generator: Optional[ScreenshotGenerator] = None
+
+
+def _init_preview_worker(
+    upload_dir: str, output_dir: str, fonts: Optional[FontRegistry]
+):
+    """Create the generator used by a preview worker process"""
+    global _worker_generator
+    if fonts is not None:
+        install_font_registry(fonts)
+    _worker_generator = ScreenshotGenerator(
+        upload_dir=upload_dir, output_dir=output_dir, export_workers=0
+    )
+
+    # Optionally prebuild device frame sprites (size FRAME_ASSET_CACHE_MB to fit)
+    if os.environ.get("FRAME_ASSET_WARMUP"):
+        _worker_generator.processor.warm_frame_assets()
+
+
+def _render_preview(method: str, kwargs: dict) -> Tuple[bytes, int]:
+    """Render inside a worker and report its memory use for recycling"""
+    image_bytes = getattr(_worker_generator, method)(**kwargs)
+    return image_bytes, _current_rss_bytes()
@@ -0,0 +1,139 @@
+"""In-process caches for rendered images"""
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, List, Optional, Tuple
+
+from PIL import Image
+
+
+def canonical_config(value: Any) -> Any:
+    """Normalize a config value so equivalent configs serialize identically
+
+    Dict keys are sorted on serialization; here numbers are unified so that
+    0 and 0.0 (template data vs. validated request data) hash the same.
+    """
+    if isinstance(value, dict):
+        return {str(k): canonical_config(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [canonical_config(v) for v in value]
+    if isinstance(value, bool) or value is None:
+        return value
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, str):
+        return str(value)
+    return repr(value)
+
+
+def config_hash(config: Any) -> str:
+    """Stable content hash of a JSON-like config"""
+    payload = json.dumps(
+        canonical_config(config), sort_keys=True, separators=(",", ":")
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def image_nbytes(image: Image.Image) -> int:
+    """Approximate memory held by an image's pixel data"""
+    return image.width * image.height * len(image.getbands())
+
+
+class LRUCache:
+    """Thread-safe LRU cache bounded by the total size of its values
+
+    sizeof reports the bytes held by a value; values larger than the whole
+    budget are not stored.
+    """
+
+    def __init__(self, max_bytes: int, sizeof: Callable[[Any], int]):
+        self.max_bytes = max_bytes
+        self._sizeof = sizeof
+        self._entries: "OrderedDict[Hashable, Tuple[Any, int]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable) -> Any:
+        """Return the cached value, or None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key: Hashable, value: Any):
+        """Store value, evicting least recently used entries to fit the budget"""
+        size = self._sizeof(value)
+        if size > self.max_bytes:
+            return
+
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old[1]
+
+            self._entries[key] = (value, size)
+            self._bytes += size
+
+            while self._bytes > self.max_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+                self.evictions += 1
+
+    def discard(self, key: Hashable):
+        """Evict one entry if present"""
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                self._bytes -= entry[1]
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self.evictions += len(self._entries)
+            self._entries.clear()
+            self._bytes = 0
+
+    def keys(self) -> List[Hashable]:
+        with self._lock:
+            return list(self._entries.keys())
+
+    def stats(self) -> dict:
+        """Hit/miss counters and current memory use"""
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions
+            }
+
+
+class ImageCache(LRUCache):
+    """LRU cache of images bounded by total pixel bytes
+
+    Callers always receive their own copy of a cached image, so drawing on
+    a result can never change what later callers get.
+    """
+
+    def __init__(self, max_bytes: int):
+        super().__init__(max_bytes, image_nbytes)
+
+    def get(self, key: Hashable) -> Optional[Image.Image]:
+        """Return a copy of the cached image, or None"""
+        image = super().get(key)
+        return image.copy() if image is not None else None
+
+    def put(self, key: Hashable, image: Image.Image):
+        """Store a private copy of image"""
+        if image_nbytes(image) <= self.max_bytes:
+            super().put(key, image.copy())
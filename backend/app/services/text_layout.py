@@ -0,0 +1,231 @@
+"""Line layout for headline text
+
+Wrapping used to measure the whole candidate line after every word, which
+is quadratic in the line length. Here text is split at its break
+opportunities (see line_breaking.py), each segment's advance and each
+space's advance are measured once per font and kept, a line's width is
+the sum of its segments and spaces, and finished wraps are cached by
+(font, text, max_width, locale), so the same headline wraps once per
+process however many devices and locales render it. For CJK text the
+segments are single characters, so a wrap is one pass over cached glyph
+advances.
+
+Letter spacing goes between characters, but not before combining marks
+or around a zero width joiner, so marks stay on their letter and joined
+sequences stay whole. Lines that need Pillow's shaping engine (see
+needs_shaping) are drawn by it without letter spacing, and measured so.
+"""
+import threading
+import unicodedata
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from PIL import ImageFont
+
+from .font_registry import FontChain
+from .line_breaking import line_segments
+
+# Wrapped texts kept per process
+MAX_CACHED_WRAPS = 2048
+
+# Segment advances kept per font before its table is cleared
+MAX_CACHED_WORDS = 8192
+
+ZERO_WIDTH_JOINER = "\u200d"
+
+MARK_CATEGORIES = ("Mn", "Mc", "Me")
+
+# Scripts whose glyphs reorder, join or stack: Indic, Thai, Lao, Tibetan,
+# Myanmar and Khmer
+COMPLEX_RANGES = (
+    (0x0900, 0x0DFF),
+    (0x0E00, 0x0EFF),
+    (0x0F00, 0x0FFF),
+    (0x1000, 0x109F),
+    (0x1780, 0x17FF),
+)
+
+_advances: Dict[tuple, Dict[str, float]] = {}
+_metrics: Dict[tuple, Tuple[int, int]] = {}
+_wraps = OrderedDict()
+_lock = threading.Lock()
+
+
+def font_key(font: ImageFont.ImageFont) -> tuple:
+    """Identity of a font face, size and variation for the measurement caches"""
+    if isinstance(font, FontChain):
+        return font.key
+    path = getattr(font, "path", None)
+    if path is None:
+        return ("id", id(font))
+    return (path, getattr(font, "index", 0), font.size, getattr(font, "variation", None))
+
+
+def takes_spacing(previous: Optional[str], char: str) -> bool:
+    """Whether letter spacing goes between previous and char"""
+    if previous == ZERO_WIDTH_JOINER or char == ZERO_WIDTH_JOINER:
+        return False
+    return unicodedata.category(char) not in MARK_CATEGORIES
+
+
+def spacing_count(text: str) -> int:
+    """Characters of text that letter spacing goes before, counting the first"""
+    count = 0
+    previous = None
+    for char in text:
+        if takes_spacing(previous, char):
+            count += 1
+        previous = char
+    return count
+
+
+def needs_shaping(font: ImageFont.ImageFont, text: str) -> bool:
+    """Whether text has to be drawn by Pillow's layout engine as a whole
+
+    True only with raqm, for right-to-left text, combining marks and
+    complex scripts: raqm reorders, joins and positions those glyphs,
+    which drawing them one by one cannot do. Under the basic layout
+    Pillow draws glyphs one by one too.
+    """
+    if getattr(font, "layout_engine", None) != ImageFont.Layout.RAQM:
+        return False
+    for char in text:
+        if (
+            unicodedata.bidirectional(char) in ("R", "AL", "AN")
+            or unicodedata.category(char) in MARK_CATEGORIES
+            or any(start <= ord(char) <= end for start, end in COMPLEX_RANGES)
+        ):
+            return True
+    return False
+
+
+def segment_advance(font: ImageFont.ImageFont, key: tuple, segment: str) -> float:
+    """Advance width of a text segment in font, measured once"""
+    table = _advances.get(key)
+    if table is None or len(table) >= MAX_CACHED_WORDS:
+        table = _advances[key] = {}
+    width = table.get(segment)
+    if width is None:
+        width = table[segment] = font.getlength(segment)
+    return width
+
+
+def line_metrics(font: ImageFont.ImageFont) -> Tuple[int, int]:
+    """(ascent, descent) of font, measured once"""
+    key = font_key(font)
+    metrics = _metrics.get(key)
+    if metrics is None:
+        if hasattr(font, "getmetrics"):
+            metrics = font.getmetrics()
+        else:
+            bbox = font.getbbox("Ag")
+            metrics = (bbox[3], 0)
+        _metrics[key] = metrics
+    return metrics
+
+
+def wrap_text(
+    text: str,
+    font: ImageFont.ImageFont,
+    max_width: Optional[float] = None,
+    locale: Optional[str] = None,
+    letter_spacing: float = 0.0
+) -> Tuple[Tuple[str, float], ...]:
+    """Split text into lines no wider than max_width
+
+    Returns (line, advance width) pairs. Lines break at newlines and at the
+    break opportunities of line_breaking.line_segments, and a segment wider
+    than max_width gets a line of its own. Without max_width only newlines
+    break. Widths include letter_spacing between the characters that
+    take it (see takes_spacing).
+    """
+    key = font_key(font)
+    cache_key = (key, text, max_width, locale, letter_spacing)
+    with _lock:
+        lines = _wraps.get(cache_key)
+        if lines is not None:
+            _wraps.move_to_end(cache_key)
+            return lines
+
+    def measure(segment: str) -> Tuple[float, int]:
+        # Advance and the characters letter spacing goes before
+        return segment_advance(font, key, segment), spacing_count(segment)
+
+    def finish(line: str, advance: float, gaps: int) -> Tuple[str, float]:
+        if letter_spacing and not needs_shaping(font, line):
+            # No spacing before the line's first character
+            advance += letter_spacing * max(gaps - 1, 0)
+        return line, advance
+
+    lines = []
+    for paragraph in text.split("\n"):
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
+
+        current: List[str] = []
+        advance = 0.0
+        gaps = 0
+        space, space_gaps = 0.0, 0
+        for segment, whitespace in line_segments(paragraph, locale):
+            segment_width, segment_gaps = measure(segment)
+            total_gaps = gaps + space_gaps + segment_gaps
+            if (
+                current and max_width is not None
+                and advance + space + segment_width + letter_spacing * (total_gaps - 1) > max_width
+            ):
+                lines.append(finish("".join(current).rstrip(), advance, gaps))
+                current = []
+                advance, gaps = 0.0, 0
+                space, space_gaps = 0.0, 0
+                total_gaps = segment_gaps
+            advance += space + segment_width
+            gaps = total_gaps
+            current.append(segment + whitespace)
+            space, space_gaps = measure(whitespace) if whitespace else (0.0, 0)
+        lines.append(finish("".join(current).rstrip(), advance, gaps))
+
+    lines = tuple(lines)
+    with _lock:
+        _wraps[cache_key] = lines
+        if len(_wraps) > MAX_CACHED_WRAPS:
+            _wraps.popitem(last=False)
+    return lines
+
+
+def layout_text(
+    text: str,
+    font: ImageFont.ImageFont,
+    position: Tuple[int, int],
+    max_width: Optional[float] = None,
+    alignment: str = "center",
+    line_height: Optional[float] = None,
+    locale: Optional[str] = None,
+    letter_spacing: float = 0.0
+) -> List[dict]:
+    """Wrap text and place each line
+
+    position is the anchor of the first line: its center, left or right
+    edge depending on alignment, and its top. Lines are line_height apart
+    (the font's own height if not given), and locale tailors where they
+    break. Returns one dict per line with its "text" and its "box" (left,
+    top, right, bottom); text is drawn at the box's top-left corner.
+    """
+    ascent, descent = line_metrics(font)
+    step = int(line_height) if line_height else ascent + descent
+
+    placed = []
+    y = position[1]
+    for line, width in wrap_text(text, font, max_width, locale, letter_spacing):
+        width = int(round(width))
+        if alignment == "center":
+            x = position[0] - width // 2
+        elif alignment == "right":
+            x = position[0] - width
+        else:
+            x = position[0]
+
+        placed.append({"text": line, "box": (x, y, x + width, y + ascent + descent)})
+        y += step
+
+    return placed
@@ -0,0 +1,357 @@
+"""Index of uploaded images
+
+Uploads live in a sharded tree, <upload_dir>/<id[0:2]>/<id[2:4]>/<id><ext>,
+so no directory grows without bound. A SQLite index maps each file ID to
+its path, byte size, dimensions and content type, so lookups never scan
+the directory. The index can be rebuilt from the files on disk at any
+time, and is rebuilt automatically when it does not exist yet.
+
+File IDs are the SHA-256 of the content, so uploading the same file again
+shares the stored copy. The index counts how many times each file was
+uploaded and only the last delete removes it; a rebuild cannot recover
+these counts and resets them to one.
+
+Uploads arrive as multipart/form-data. MultipartUpload parses the body as
+it is received and streams the file part into an IncomingUpload, which
+hashes and size-checks every chunk on its way to a temporary file, so an
+oversized upload is rejected while it is still being sent.
+"""
+import hashlib
+import mimetypes
+import os
+import sqlite3
+import time
+import uuid
+from contextlib import closing, contextmanager
+from typing import Collection, Iterator, Optional
+
+from PIL import Image
+
+try:
+    import python_multipart as multipart
+    from python_multipart.multipart import parse_options_header
+except ImportError:
+    # python-multipart before 0.0.13
+    import multipart
+    from multipart.multipart import parse_options_header
+
+INDEX_FILENAME = "index.sqlite3"
+
+# Subdirectories of a shard that hold derived files rather than uploads
+DERIVED_DIRS = {"variants"}
+
+# Bytes read per chunk while streaming an upload to disk
+CHUNK_SIZE = 1024 * 1024
+
+# Room for multipart boundaries, part headers and other fields around the
+# file itself
+MULTIPART_OVERHEAD = 64 * 1024
+
+
+class UploadTooLarge(Exception):
+    """Raised when an upload grows past the size limit"""
+
+    def __init__(self, max_size: int):
+        super().__init__(f"Upload exceeds {max_size} bytes")
+        self.max_size = max_size
+
+
+class UnsupportedUploadType(ValueError):
+    """Raised when an uploaded file has a content type that isn't allowed"""
+
+    def __init__(self, content_type: Optional[str]):
+        super().__init__(f"Unsupported file type: {content_type}")
+        self.content_type = content_type
+
+
+class IncomingUpload:
+    """An upload being written to a temporary file as it arrives
+
+    Every chunk is hashed and counted on the way; UploadTooLarge is raised
+    as soon as the total passes max_size.
+    """
+
+    def __init__(self, directory: str, max_size: Optional[int] = None):
+        self.path = os.path.join(directory, f".incoming-{uuid.uuid4()}")
+        self.max_size = max_size
+        self.size = 0
+        self.digest = hashlib.sha256()
+        self._file = open(self.path, "wb")
+
+    def write(self, chunk: bytes):
+        self.size += len(chunk)
+        if self.max_size is not None and self.size > self.max_size:
+            raise UploadTooLarge(self.max_size)
+        self.digest.update(chunk)
+        self._file.write(chunk)
+
+    def close(self):
+        self._file.close()
+
+    def discard(self):
+        """Close and delete the temporary file, unless it was moved away"""
+        self.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+class MultipartUpload:
+    """Streams one file field of a multipart/form-data body to disk
+
+    Feed the body to write() as it is received. The file part named field
+    goes into an IncomingUpload limited to max_size bytes; other parts are
+    skipped, and the whole body may be at most MULTIPART_OVERHEAD larger.
+    UnsupportedUploadType is raised from the file part's headers, before
+    any of its data, when its type is not in allowed_types.
+    """
+
+    def __init__(
+        self,
+        content_type: str,
+        field: str,
+        directory: str,
+        max_size: int,
+        allowed_types: Optional[Collection[str]] = None
+    ):
+        mime_type, params = parse_options_header(content_type)
+        boundary = params.get(b"boundary")
+        if mime_type != b"multipart/form-data" or not boundary:
+            raise ValueError("Expected a multipart/form-data body")
+
+        self.field = field
+        self.directory = directory
+        self.max_size = max_size
+        self.allowed_types = allowed_types
+        self.received = 0
+        self.incoming: Optional[IncomingUpload] = None
+        self.filename: Optional[str] = None
+        self.content_type: Optional[str] = None
+
+        self._headers = {}
+        self._header_field = b""
+        self._header_value = b""
+        self._in_file = False
+        self._done = False
+        self._parser = multipart.MultipartParser(boundary, {
+            "on_part_begin": self._on_part_begin,
+            "on_header_field": self._on_header_field,
+            "on_header_value": self._on_header_value,
+            "on_header_end": self._on_header_end,
+            "on_headers_finished": self._on_headers_finished,
+            "on_part_data": self._on_part_data,
+            "on_part_end": self._on_part_end
+        })
+
+    def write(self, chunk: bytes):
+        self.received += len(chunk)
+        if self.received > self.max_size + MULTIPART_OVERHEAD:
+            raise UploadTooLarge(self.max_size)
+        self._parser.write(chunk)
+
+    def finish(self) -> IncomingUpload:
+        """End the body and return the received file, closed"""
+        self._parser.finalize()
+        if self.incoming is None or not self._done:
+            raise ValueError(f"Missing file field '{self.field}'")
+        self.incoming.close()
+        return self.incoming
+
+    def discard(self):
+        """Delete the received file, unless it was stored"""
+        if self.incoming is not None:
+            self.incoming.discard()
+
+    def _on_part_begin(self):
+        self._headers = {}
+
+    def _on_header_field(self, data: bytes, start: int, end: int):
+        self._header_field += data[start:end]
+
+    def _on_header_value(self, data: bytes, start: int, end: int):
+        self._header_value += data[start:end]
+
+    def _on_header_end(self):
+        self._headers[self._header_field.lower()] = self._header_value
+        self._header_field = b""
+        self._header_value = b""
+
+    def _on_headers_finished(self):
+        _, disposition = parse_options_header(self._headers.get(b"content-disposition", b""))
+        name = disposition.get(b"name", b"").decode("utf-8", "replace")
+        self._in_file = name == self.field and self.incoming is None
+        if not self._in_file:
+            return
+
+        self.filename = disposition.get(b"filename", b"").decode("utf-8", "replace")
+        content_type = self._headers.get(b"content-type")
+        self.content_type = content_type.decode("latin-1").strip() if content_type else None
+        if self.allowed_types is not None and self.content_type not in self.allowed_types:
+            raise UnsupportedUploadType(self.content_type)
+        self.incoming = IncomingUpload(self.directory, self.max_size)
+
+    def _on_part_data(self, data: bytes, start: int, end: int):
+        if self._in_file:
+            self.incoming.write(data[start:end])
+
+    def _on_part_end(self):
+        if self._in_file:
+            self._done = True
+            self._in_file = False
+
+
+class UploadIndex:
+    """Persistent file_id -> upload metadata index for one upload directory"""
+
+    def __init__(self, upload_dir: str):
+        self.upload_dir = os.path.abspath(upload_dir)
+        self.db_path = os.path.join(self.upload_dir, INDEX_FILENAME)
+
+        # Several processes may open a new index at once; the write lock
+        # makes exactly one of them create and fill it
+        with self._write_transaction() as conn:
+            existed = conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'uploads'"
+            ).fetchone() is not None
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS uploads ("
+                " id TEXT PRIMARY KEY,"
+                " path TEXT NOT NULL,"
+                " size INTEGER NOT NULL,"
+                " width INTEGER NOT NULL,"
+                " height INTEGER NOT NULL,"
+                " content_type TEXT,"
+                " created_at REAL NOT NULL,"
+                " refs INTEGER NOT NULL DEFAULT 1)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)"
+            )
+            columns = [row[1] for row in conn.execute("PRAGMA table_info(uploads)")]
+            if "refs" not in columns:
+                conn.execute(
+                    "ALTER TABLE uploads ADD COLUMN refs INTEGER NOT NULL DEFAULT 1"
+                )
+
+            indexed = conn.execute(
+                "SELECT 1 FROM meta WHERE key = 'indexed'"
+            ).fetchone() is not None
+            if not indexed and not existed:
+                # Index uploads saved before the index existed
+                self._rebuild(conn)
+            conn.execute("INSERT OR REPLACE INTO meta VALUES ('indexed', '1')")
+
+    def _connect(self) -> sqlite3.Connection:
+        # A connection per call keeps this safe across threads and processes
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    @contextmanager
+    def _write_transaction(self) -> Iterator[sqlite3.Connection]:
+        """A connection holding the database's write lock until it commits"""
+        with closing(self._connect()) as conn:
+            conn.isolation_level = None
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+
+    def shard_dir(self, file_id: str) -> str:
+        """Directory an upload with this ID is stored in"""
+        return os.path.join(self.upload_dir, file_id[0:2], file_id[2:4])
+
+    def add(
+        self,
+        file_id: str,
+        path: str,
+        size: int,
+        width: int,
+        height: int,
+        content_type: Optional[str] = None
+    ):
+        """Record an upload, or one more reference to an indexed one"""
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                "INSERT INTO uploads VALUES (?, ?, ?, ?, ?, ?, ?, 1)"
+                " ON CONFLICT(id) DO UPDATE SET refs = refs + 1",
+                (
+                    file_id,
+                    os.path.relpath(os.path.abspath(path), self.upload_dir),
+                    size, width, height, content_type, time.time()
+                )
+            )
+
+    def get(self, file_id: str) -> Optional[dict]:
+        """Metadata for an upload, with an absolute path, or None"""
+        with closing(self._connect()) as conn:
+            row = conn.execute(
+                "SELECT * FROM uploads WHERE id = ?", (file_id,)
+            ).fetchone()
+        return self._entry(row)
+
+    def remove(self, file_id: str) -> Optional[dict]:
+        """Drop one reference to an upload and return its metadata
+
+        The returned refs is the number left; the entry leaves the index
+        when it reaches zero.
+        """
+        with closing(self._connect()) as conn, conn:
+            row = conn.execute(
+                "UPDATE uploads SET refs = refs - 1 WHERE id = ? RETURNING *",
+                (file_id,)
+            ).fetchone()
+            if row is not None and row["refs"] <= 0:
+                conn.execute("DELETE FROM uploads WHERE id = ?", (file_id,))
+        return self._entry(row)
+
+    def _entry(self, row: Optional[sqlite3.Row]) -> Optional[dict]:
+        if row is None:
+            return None
+
+        entry = dict(row)
+        entry["path"] = os.path.join(self.upload_dir, entry["path"])
+        return entry
+
+    def rebuild(self) -> int:
+        """Re-index every upload found on disk and return how many there are
+
+        Files that are not readable images are skipped. The index stays
+        locked for writing during the walk, so no upload added meanwhile
+        is lost.
+        """
+        with self._write_transaction() as conn:
+            return self._rebuild(conn)
+
+    def _rebuild(self, conn: sqlite3.Connection) -> int:
+        entries = []
+        for root, dirs, files in os.walk(self.upload_dir):
+            dirs[:] = [d for d in dirs if d not in DERIVED_DIRS]
+            for filename in files:
+                file_id, ext = os.path.splitext(filename)
+                content_type = mimetypes.guess_type(filename)[0]
+                if not content_type or not content_type.startswith("image/"):
+                    continue
+
+                path = os.path.join(root, filename)
+                try:
+                    with Image.open(path) as img:
+                        width, height = img.size
+                except Exception:
+                    continue
+                stat = os.stat(path)
+                entries.append((
+                    file_id,
+                    os.path.relpath(path, self.upload_dir),
+                    stat.st_size, width, height, content_type, stat.st_mtime, 1
+                ))
+
+        conn.execute("DELETE FROM uploads")
+        conn.executemany(
+            "INSERT OR REPLACE INTO uploads VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            entries
+        )
+        return len(entries)
@@ -0,0 +1,104 @@
+"""Benchmark: export time as a function of locale count
+
+Renders one screenshot per device for an increasing number of locales and
+compares the total against the cost of a single base layer plus one text
+layer (and its PNG encode) per locale. With the layered render path the
+export should grow by roughly that per-locale cost for each extra locale.
+
+Run from the backend directory:
+    python -m benchmarks.export_locales
+"""
+import os
+import tempfile
+import time
+
+from PIL import Image
+
+from app.data.locales import LOCALES
+from app.services.generator import ScreenshotGenerator
+
+LOCALE_COUNTS = [1, 5, 10, 20, len(LOCALES)]
+DEVICE_ID = "iphone-6.9"
+
+
+def _make_project(screen_path: str, locales: list) -> dict:
+    """Build a one-screenshot project with a headline translated for each locale"""
+    return {
+        "screenshots": [{
+            "template": {
+                "background": {
+                    "type": "gradient",
+                    "gradient": {
+                        "type": "linear",
+                        "angle": 135,
+                        "stops": [
+                            {"color": "#667EEA", "position": 0},
+                            {"color": "#764BA2", "position": 1}
+                        ]
+                    }
+                }
+            },
+            "device": {"model": DEVICE_ID, "scale": 0.8},
+            "image": {"path": screen_path},
+            "texts": [{
+                "translations": {
+                    code: f"Track every habit in one place ({code})"
+                    for code in locales
+                },
+                "style": {"font_size": 110, "color": "#FFFFFF"},
+                "position_y": 0.06
+            }]
+        }]
+    }
+
+
+def _timed(func, *args, **kwargs):
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        # Rendered in this process, so the timings measure the text layer
+        # alone rather than worker start-up and per-unit base layers
+        generator = ScreenshotGenerator(upload_dir=tmp, output_dir=tmp, export_workers=0)
+
+        screen_path = os.path.join(tmp, "screen.png")
+        Image.new("RGBA", (1320, 2868), (240, 240, 245, 255)).save(screen_path)
+
+        all_locales = list(LOCALES.keys())
+        project = _make_project(screen_path, all_locales)
+        screenshot = project["screenshots"][0]
+
+        # Warm up font and module caches before measuring
+        generator.render_base_layer(screenshot, 1320, 2868)
+
+        # Cost of each layer on its own
+        base, base_time = _timed(generator.render_base_layer, screenshot, 1320, 2868)
+        output, text_time = _timed(
+            generator.render_text_layer, base, screenshot, "en", 1320, 2868
+        )
+        _, encode_time = _timed(
+            generator.processor.export_to_size, output, 1320, 2868, "png"
+        )
+        print(f"base layer: {base_time * 1000:8.1f} ms")
+        print(f"text layer: {text_time * 1000:8.1f} ms")
+        print(f"png encode: {encode_time * 1000:8.1f} ms")
+        print()
+        print(f"{'locales':>8} {'export ms':>10} {'per locale ms':>14}")
+
+        for count in LOCALE_COUNTS:
+            config = {
+                "devices": [DEVICE_ID],
+                "locales": all_locales[:count],
+                "format": "png"
+            }
+            output_path, elapsed = _timed(generator.generate_exports, project, config)
+            os.remove(output_path)
+            per_locale = (elapsed - base_time) / count
+            print(f"{count:>8} {elapsed * 1000:>10.1f} {per_locale * 1000:>14.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""Benchmark: downscaling rendered screenshots with resample_image
+
+Renders one full-size screenshot per device and shrinks it by each scale
+factor, once with a plain LANCZOS resize (the previous behavior) and once
+with resample_image for each quality profile. Reports the time of each
+and its PSNR against the plain LANCZOS result.
+
+Run from the backend directory:
+    python -m benchmarks.resample
+"""
+import math
+import os
+import tempfile
+import time
+
+import numpy as np
+from PIL import Image, ImageDraw
+
+from app.data.devices import DEVICE_SPECS
+from app.services.generator import ScreenshotGenerator
+from app.services.image_processor import QUALITY_PROFILES, resample_image
+
+SCALE_FACTORS = [0.5, 0.25, 0.1]
+REPEATS = 3
+
+
+def _make_screen(path: str, width: int, height: int):
+    """Save a screen image with UI-like detail: bars, rows of text, an icon grid"""
+    image = Image.new("RGBA", (width, height), (246, 246, 250, 255))
+    draw = ImageDraw.Draw(image)
+    unit = max(8, width // 40)
+    draw.rectangle((0, 0, width, unit * 4), fill=(30, 110, 240, 255))
+    for row in range(6, height // unit, 3):
+        y = row * unit
+        draw.rounded_rectangle(
+            (unit, y, unit * 3, y + unit * 2), radius=unit // 2, fill=(255, 149, 0, 255)
+        )
+        draw.text((unit * 4, y), f"Row {row} - habit streak", fill=(20, 20, 24, 255))
+        draw.line((unit * 4, y + unit * 2, width - unit, y + unit * 2), fill=(200, 200, 206, 255))
+    image.save(path)
+
+
+def _screenshot_config(screen_path: str) -> dict:
+    return {
+        "template": {
+            "background": {
+                "type": "gradient",
+                "gradient": {
+                    "type": "linear",
+                    "angle": 135,
+                    "stops": [
+                        {"color": "#667EEA", "position": 0},
+                        {"color": "#764BA2", "position": 1}
+                    ]
+                }
+            }
+        },
+        "device": {"scale": 0.8},
+        "image": {"path": screen_path},
+        "texts": [{
+            "translations": {"en": "Track every habit in one place"},
+            "style": {"font_size": 96, "color": "#FFFFFF"},
+            "position_y": 0.06
+        }]
+    }
+
+
+def _timed(func, *args):
+    best = math.inf
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        result = func(*args)
+        best = min(best, time.perf_counter() - start)
+    return result, best
+
+
+def _psnr(image: Image.Image, reference: Image.Image) -> float:
+    error = np.asarray(image, dtype=np.float64) - np.asarray(reference, dtype=np.float64)
+    mse = np.mean(error * error)
+    return math.inf if mse == 0 else 10 * math.log10(255 * 255 / mse)
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        generator = ScreenshotGenerator(upload_dir=tmp, output_dir=tmp, export_workers=0)
+
+        header = f"{'device':<16} {'scale':>5} {'lanczos ms':>11}"
+        for quality in QUALITY_PROFILES:
+            header += f" {quality + ' ms':>12} {'psnr':>6}"
+        print(header)
+
+        for device_id, spec in DEVICE_SPECS.items():
+            width, height = spec["width"], spec["height"]
+            screen_path = os.path.join(tmp, f"{device_id}.png")
+            _make_screen(screen_path, spec["screen_width"], spec["screen_height"])
+
+            config = _screenshot_config(screen_path)
+            config["device"]["model"] = device_id
+            image = generator.render_screenshot(config, width=width, height=height)
+
+            for factor in SCALE_FACTORS:
+                size = (max(1, round(width * factor)), max(1, round(height * factor)))
+                reference, reference_time = _timed(
+                    image.resize, size, Image.Resampling.LANCZOS
+                )
+                line = f"{device_id:<16} {factor:>5} {reference_time * 1000:>11.1f}"
+                for quality in QUALITY_PROFILES:
+                    output, elapsed = _timed(resample_image, image, size, quality)
+                    line += f" {elapsed * 1000:>12.1f} {_psnr(output, reference):>6.1f}"
+                print(line)
+
+
+if __name__ == "__main__":
+    main()